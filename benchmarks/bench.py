@@ -0,0 +1,222 @@
+"""
+Benchmark suite with fixed workloads.
+
+    python benchmarks/bench.py                  run every workload
+    python benchmarks/bench.py -k battle        run workloads named like 'battle'
+    python benchmarks/bench.py --save FILE      store the results as a baseline
+    python benchmarks/bench.py --compare FILE   compare with a stored baseline,
+                                                exiting with 1 on regressions
+
+Every workload reports operations per second (best of several repeats)
+and the peak memory allocated by one operation.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from rpg_battle import heroes
+from rpg_battle import monsters
+from rpg_battle.abilities import REGISTRY
+from rpg_battle.battle import ONGOING, VICTORY, Battle
+from rpg_battle.dispatch import dispatch
+
+HEROES = (heroes.Hero, heroes.Warrior, heroes.Mage, heroes.Cleric,
+          heroes.Rogue)
+MONSTERS = (monsters.Monster, monsters.RedDragon, monsters.GreenDragon,
+            monsters.Vampire, monsters.Skeleton, monsters.Troll,
+            monsters.Orc)
+LEVEL = 50
+
+
+class _Target(object):
+    """
+    Target that never changes, so an ability costs the same every call
+    """
+    hp = maxhp = 10 ** 9
+
+    def take_damage(self, damage):
+        pass
+
+    def heal_damage(self, healing):
+        pass
+
+
+def construct(cls):
+    def setup():
+        return lambda: cls(level=LEVEL)
+    return setup
+
+
+def gain_xp(cls):
+    def setup():
+        hero = cls()
+
+        def op():
+            hero.reset(1)
+            hero.gain_xp(10 ** 6)
+        return op
+    return setup
+
+
+def ability(cls, name):
+    def setup():
+        unit = cls(level=10)
+        if hasattr(unit, 'mp'):
+            unit.mp = 10 ** 12
+        method = getattr(unit, name)
+        target = _Target()
+        return lambda: method(target)
+    return setup
+
+
+def battle(heroes_count, monsters_count, hero_level, expected):
+    """
+    A full headless battle: Warriors and Mages against level 1 Orcs,
+    Skeletons and Vampires, heroes fighting the first living monster until
+    the expected status ends it. The units are built once and reset() for
+    every operation, so only the battle itself is timed.
+    """
+    party = [heroes.Warrior, heroes.Mage]
+    lineup = [monsters.Orc, monsters.Skeleton, monsters.Vampire]
+
+    def setup():
+        units = ([party[i % 2](level=hero_level)
+                  for i in range(heroes_count)] +
+                 [lineup[i % 3]() for i in range(monsters_count)])
+
+        def op():
+            for unit in units:
+                unit.reset()
+            fight = Battle(units, headless=True, seed=1)
+            status = fight.step()
+            while status == ONGOING:
+                target = fight.participants[fight.alive_monsters[0]]
+                status = fight.step('fight', target)
+            return status, fight.alive_monsters
+        status, alive = op()
+        # the workload must stay a battle fought to the end
+        if status != expected or (status == VICTORY and alive):
+            raise RuntimeError('{} heroes against {} monsters ended with '
+                               'status {}, expected {}'.format(
+                                   heroes_count, monsters_count, status,
+                                   expected))
+        return op
+    return setup
+
+
+def _workloads():
+    workloads = []
+    for cls in HEROES + MONSTERS:
+        workloads.append(('construct {}(level={})'.format(cls.__name__, LEVEL),
+                          construct(cls)))
+    for cls in HEROES:
+        workloads.append(('gain_xp {} 10**6'.format(cls.__name__),
+                          gain_xp(cls)))
+    # every registered ability, used by the first class that has it
+    for name in sorted(REGISTRY):
+        cls = next(cls for cls in HEROES + MONSTERS
+                   if name in dispatch(cls).ids)
+        workloads.append(('ability {}.{}'.format(cls.__name__, name),
+                          ability(cls, name)))
+    # every monster kill gives xp to every living hero, so the large battle
+    # has few strong heroes that still outlast 9900 monsters
+    for heroes_count, monsters_count, hero_level in ((2, 2, 20),
+                                                    (20, 80, 20),
+                                                    (100, 9900, 300)):
+        workloads.append(('battle {} participants'.format(
+            heroes_count + monsters_count),
+            battle(heroes_count, monsters_count, hero_level, VICTORY)))
+    return workloads
+
+
+WORKLOADS = _workloads()
+
+
+def measure(setup, min_time=0.2, repeat=3):
+    """
+    Returns (operations per second, peak bytes allocated by one operation)
+    """
+    op = setup()
+    timer = timeit.Timer(op)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed * 1.2))
+    best = min([elapsed] + timer.repeat(repeat - 1, number))
+    peak = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        op()
+        peak = tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+    return number / best, peak
+
+
+def _format(name, ops, peak, baseline=None):
+    line = '{:<45} {:>14,.1f} ops/s'.format(name, ops)
+    line += '   {:>10} B peak'.format('-' if peak is None else
+                                      '{:,}'.format(peak))
+    if baseline is not None:
+        line += '   {:+.1%}'.format(ops / baseline - 1)
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-k', dest='pattern', default='',
+                        help='only run workloads whose name contains this')
+    parser.add_argument('--save', metavar='FILE',
+                        help='write the results to FILE as a baseline')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='compare the results with the baseline in FILE')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='slowdown reported as a regression (0.1 = 10%%)')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='seconds each timing run lasts at least')
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    for name, setup in WORKLOADS:
+        if args.pattern not in name:
+            continue
+        ops, peak = measure(setup, args.min_time)
+        results[name] = {'ops': ops, 'peak': peak}
+        expected = baseline.get(name, {}).get('ops')
+        print(_format(name, ops, peak, expected))
+        sys.stdout.flush()
+        if expected and ops < expected * (1 - args.tolerance):
+            regressions.append(name)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if regressions:
+        print('\n{} regression(s) beyond {:.0%}:'.format(len(regressions),
+                                                        args.tolerance))
+        for name in regressions:
+            print('  ' + name)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
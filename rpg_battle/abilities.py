@@ -0,0 +1,240 @@
+"""
+Declarative ability registry.
+
+Every ability is described as data: an optional mp cost, an optional
+precondition on the target and a list of effects whose amounts are
+formulas over the user's stats. Each entry is compiled once into a plain
+method for the unit classes, a check telling whether the method would
+raise, and a vectorized form for the numpy battle engine, so all of them
+run from the same definition.
+
+Effects:
+    damage       target.take_damage(amount)
+    heal         target.heal_damage(amount)
+    lower_maxhp  target.maxhp -= amount
+    restore      heals the user, not exceeding maxhp
+    self_damage  self.hp -= amount
+    self_heal    self.hp += amount
+"""
+import ast
+
+from . import fixed
+from .exceptions import *
+
+STATS = frozenset(['strength', 'constitution', 'intelligence', 'speed',
+                   'level', 'hp', 'maxhp', 'mp', 'maxmp'])
+
+_STATEMENTS = {
+    'damage': ['target.take_damage({0})'],
+    'heal': ['target.heal_damage({0})'],
+    'lower_maxhp': ['target.maxhp -= {0}'],
+    'restore': ['self.hp += {0}',
+                'if self.hp > self.maxhp:',
+                '    self.hp = self.maxhp'],
+    'self_damage': ['self.hp -= {0}'],
+    'self_heal': ['self.hp += {0}'],
+}
+
+
+def _names(expression):
+    return set(node.id for node in ast.walk(ast.parse(expression, mode='eval'))
+               if isinstance(node, ast.Name))
+
+
+class Ability(object):
+    def __init__(self, name, effects, mp_cost=0, precondition=None):
+        """
+        effects is a list of (effect, formula) pairs, applied in order.
+        precondition is an expression over target that must hold, else
+        InvalidTarget is raised.
+        """
+        self.name = name
+        self.effects = list(effects)
+        self.mp_cost = mp_cost
+        self.precondition = precondition
+        self.method = self._compile_method()
+        self.check = self._compile_check()
+        self._codes = [(effect, compile(formula, name, 'eval'))
+                       for effect, formula in self.effects]
+        self._precondition = (precondition and
+                              compile(precondition, name, 'eval'))
+        # integer forms over fixed-point stats, see fixed.fixed_formula
+        names = STATS | set(['target'])
+        self._fixed_codes = [
+            (effect, compile(fixed.fixed_formula(formula, names), name, 'eval'))
+            for effect, formula in self.effects]
+        self._fixed_precondition = (precondition and compile(
+            fixed.fixed_formula(precondition, names), name, 'eval'))
+
+    def describe(self):
+        lines = []
+        if self.mp_cost:
+            lines.append('cost: {} mp'.format(self.mp_cost))
+        if self.precondition:
+            lines.append('restriction: {}, else raise InvalidTarget'.format(
+                self.precondition))
+        for effect, formula in self.effects:
+            lines.append('{}: {}'.format(effect.replace('_', ' '), formula))
+        return '\n'.join(lines)
+
+    def _compile_method(self):
+        """
+        Generates the unit method, equivalent to a hand-written one
+        """
+        body = []
+        if self.precondition:
+            body += ['if not ({}):'.format(self.precondition),
+                     '    raise InvalidTarget()']
+        if self.mp_cost:
+            body += ['if self.mp < {}:'.format(self.mp_cost),
+                     '    raise InsufficientMP()',
+                     'self.mp -= {}'.format(self.mp_cost)]
+        used = set()
+        for _, formula in self.effects:
+            used |= _names(formula) & STATS
+        body += ['{0} = self.{0}'.format(stat) for stat in sorted(used)]
+        for index, (effect, formula) in enumerate(self.effects):
+            body.append('amount{} = {}'.format(index, formula))
+            body += [line.format('amount{}'.format(index))
+                     for line in _STATEMENTS[effect]]
+        source = 'def {}(self, target=None):\n{}\n'.format(
+            self.name, '\n'.join('    ' + line for line in body or ['pass']))
+        namespace = {'InvalidTarget': InvalidTarget,
+                     'InsufficientMP': InsufficientMP}
+        exec(compile(source, '<ability {}>'.format(self.name), 'exec'),
+             namespace)
+        method = namespace[self.name]
+        method.__doc__ = '\n' + self.describe() + '\n'
+        return method
+
+    def _compile_check(self):
+        """
+        Generates check(unit, target), returning the exception class the
+        method would raise (InvalidTarget, InsufficientMP) or None
+        """
+        body = []
+        if self.precondition:
+            body += ['if not ({}):'.format(self.precondition),
+                     '    return InvalidTarget']
+        if self.mp_cost:
+            body += ['if self.mp < {}:'.format(self.mp_cost),
+                     '    return InsufficientMP']
+        body.append('return None')
+        source = 'def check(self, target=None):\n{}\n'.format(
+            '\n'.join('    ' + line for line in body))
+        namespace = {'InvalidTarget': InvalidTarget,
+                     'InsufficientMP': InsufficientMP}
+        exec(compile(source, '<check {}>'.format(self.name), 'exec'),
+             namespace)
+        return namespace['check']
+
+    def preview(self, unit):
+        """
+        Returns the (effect, amount) pairs unit would apply with this
+        ability, without applying them
+        """
+        namespace = dict((stat, getattr(unit, stat, 0)) for stat in STATS)
+        return [(effect, eval(code, namespace)) for effect, code in self._codes]
+
+    def vectorized(self, eng, b, u, t):
+        """
+        Applies the ability for user column u on target columns t in
+        battles b of a numpy engine (see vectorized.BatchBattle). Returns
+        the mask of battles where it could be used. Engines with a scale
+        other than 1 hold fixed-point stats and get integer arithmetic.
+        """
+        import numpy as np
+        scale = getattr(eng, 'scale', 1)
+        if scale == 1:
+            codes, precondition = self._codes, self._precondition
+            namespace = {'int': np.trunc}
+        else:
+            codes = self._fixed_codes
+            precondition = self._fixed_precondition
+            namespace = {'trunc': fixed.trunc, 'SCALE': scale}
+        mp_cost = self.mp_cost * scale
+        ok = np.ones(len(b), dtype=bool)
+        if precondition:
+            namespace['target'] = _Columns(eng, b, t)
+            ok &= np.asarray(eval(precondition, namespace))
+        if mp_cost:
+            ok &= eng.mp[b, u] >= mp_cost
+        b, t = b[ok], t[ok]
+        if mp_cost:
+            eng.mp[b, u] -= mp_cost
+        namespace.update((stat, getattr(eng, stat)[b, u]) for stat in STATS)
+        for effect, code in codes:
+            amount = eval(code, namespace)
+            if effect == 'damage':
+                eng.take_damage(b, t, amount)
+            elif effect == 'heal':
+                eng.heal_damage(b, t, amount)
+            elif effect == 'lower_maxhp':
+                eng.maxhp[b, t] -= amount
+            elif effect == 'restore':
+                eng.hp[b, u] = np.minimum(eng.hp[b, u] + amount,
+                                          eng.maxhp[b, u])
+            elif effect == 'self_damage':
+                eng.hp[b, u] -= amount
+            elif effect == 'self_heal':
+                eng.hp[b, u] += amount
+        return ok
+
+
+class _Columns(object):
+    """
+    Attribute access to the target columns of a numpy engine
+    """
+    def __init__(self, eng, b, t):
+        self._eng = eng
+        self._b = b
+        self._t = t
+
+    def __getattr__(self, stat):
+        return getattr(self._eng, stat)[self._b, self._t]
+
+
+REGISTRY = {}
+
+
+def register(name, effects, mp_cost=0, precondition=None):
+    ability = REGISTRY[name] = Ability(name, effects, mp_cost, precondition)
+    return ability
+
+
+def method(name):
+    """
+    Returns the compiled unit method of a registered ability
+    """
+    return REGISTRY[name].method
+
+
+register('fight', [('damage', 'strength')])
+
+# heroes
+register('shield_slam', [('damage', 'int(1.5 * strength)')], mp_cost=5)
+register('reckless_charge', [('damage', '2 * strength'),
+                             ('self_damage', '4')])
+register('fireball', [('damage', 'int(6 + 0.5 * intelligence)')], mp_cost=8)
+register('frostbolt', [('damage', '3 + level')], mp_cost=3)
+register('heal', [('heal', 'constitution')], mp_cost=4)
+register('smite', [('damage', 'int(4 + 0.5 * (intelligence + constitution))')],
+         mp_cost=7)
+register('backstab', [('damage', '2 * strength')],
+         precondition='target.hp == target.maxhp')
+register('rapid_strike', [('damage', '4 + speed')], mp_cost=5)
+
+# monsters
+register('tail_swipe', [('damage', 'strength + speed')])
+register('fire_breath', [('damage', 'intelligence * 2.5')])
+register('poison_breath', [('damage', '(intelligence + constitution) * 1.5')])
+register('life_drain', [('damage', 'intelligence * 1.5'),
+                        ('restore', 'intelligence * 1.5')])
+register('bite', [('damage', 'speed * 0.5'),
+                  ('lower_maxhp', 'speed * 0.5'),
+                  ('restore', 'speed * 0.5')])
+register('bash', [('damage', 'strength * 2')])
+register('slash', [('damage', 'strength + speed')])
+register('regenerate', [('self_heal', 'constitution')])
+register('blood_rage', [('damage', 'strength * 2'),
+                        ('self_damage', 'constitution * 0.5')])
@@ -0,0 +1,197 @@
+import math
+import random
+from timeit import default_timer
+
+from .battle import DEFEAT, ONGOING, VICTORY
+
+# abilities aimed at allies rather than monsters
+SUPPORT_ABILITIES = frozenset(['heal'])
+
+
+class Node(object):
+    """
+    Open-loop search tree node: children are keyed by the (command, target
+    index) taken from here, whatever the monsters rolled in between.
+    """
+    __slots__ = ('visits', 'value', 'children', 'invalid')
+
+    def __init__(self):
+        self.visits = 0
+        self.value = 0.0
+        self.children = {}
+        self.invalid = set()
+
+
+def actions(battle, hero):
+    """
+    Returns the candidate (command, target index) pairs for hero, the
+    current attacker: its legal support abilities on heroes and its other
+    legal commands on monsters
+    """
+    heroes = battle.alive_heroes
+    return [(command, target) for command, target in battle.legal_actions()
+            if (command in SUPPORT_ABILITIES) == (target in heroes)]
+
+
+def evaluate(battle):
+    """
+    Scores an unfinished battle between 0 (defeat) and 1 (victory) by
+    remaining hero hp and damage done to the monsters
+    """
+    heroes = sum(max(hero.hp, 0) for hero in battle.heroes)
+    heroes_max = sum(hero.maxhp for hero in battle.heroes) or 1
+    monsters = sum(max(monster.hp, 0) for monster in battle.monsters)
+    monsters_max = sum(monster.maxhp for monster in battle.monsters) or 1
+    return (0.5 * heroes / heroes_max +
+            0.5 * (1 - float(monsters) / monsters_max))
+
+
+class AutoPilot(object):
+    def __init__(self, budget=50, iterations=None, depth=20,
+                 exploration=1.4, seed=None):
+        """
+        Monte Carlo tree search over hero commands.
+        budget is the time limit per decision in milliseconds, iterations
+        an optional cap on playouts, depth the number of hero turns looked
+        ahead. The tree is kept between decisions and reused whenever the
+        battle went down a branch that has been searched already.
+        Monster rolls in playouts come from the pilot's seed, not the
+        battle's, so the search averages over what the monsters may do.
+        """
+        self.budget = budget
+        self.iterations = iterations
+        self.depth = depth
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.root = None
+        self._battle = None
+        self._history = 0
+
+    def __call__(self, battle, hero):
+        """
+        Lets an AutoPilot be used as a simulate policy
+        """
+        return self.decide(battle)
+
+    def decide(self, battle):
+        """
+        Returns the (command, target) the current hero should execute
+        """
+        self._reuse(battle)
+        deadline = default_timer() + self.budget / 1000.0
+        snapshot = battle.snapshot()
+        # restore clears the events, the caller may still render them
+        events = battle.events
+        headless, battle.headless = battle.headless, True
+        playouts = 0
+        try:
+            while playouts < 1 or default_timer() < deadline:
+                if self.iterations is not None and playouts >= self.iterations:
+                    break
+                # restore brings back the battle's own rolls, every playout
+                # samples the monsters afresh instead
+                battle.rng.seed(self.rng.getrandbits(64))
+                self._playout(battle)
+                battle.restore(snapshot)
+                playouts += 1
+        finally:
+            battle.restore(snapshot)
+            battle.events = events
+            battle.headless = headless
+
+        legal = [(action, child) for action, child in self.root.children.items()
+                 if action not in self.root.invalid]
+        if not legal:
+            return 'fight', next(monster for monster in battle.monsters
+                                 if not monster.is_dead())
+        (command, target), _ = max(legal, key=lambda item: item[1].visits)
+        return command, battle.participants[target]
+
+    def _reuse(self, battle):
+        """
+        Moves the root down the commands executed since the last decision,
+        starting a fresh tree if they were never explored
+        """
+        node = None
+        if battle is self._battle and self.root is not None:
+            node = self.root
+            for command in battle.commands[self._history:]:
+                node = node.children.get(command)
+                if node is None:
+                    break
+        self.root = node or Node()
+        self._battle = battle
+        self._history = len(battle.commands)
+
+    def _select(self, node, candidates):
+        untried = [action for action in candidates
+                   if action not in node.children]
+        if untried:
+            return self.rng.choice(untried)
+        log_visits = math.log(node.visits or 1)
+        best, best_score = None, None
+        for action in candidates:
+            child = node.children[action]
+            score = (child.value / child.visits + self.exploration *
+                     math.sqrt(log_visits / child.visits))
+            if best_score is None or score > best_score:
+                best, best_score = action, score
+        return best
+
+    def _step(self, battle, node, choose):
+        """
+        Executes one hero command picked by choose, skipping commands that
+        turn out to be invalid. Returns the command (None if no command
+        could be executed) and the final score if the battle ended.
+        """
+        hero = battle.current_attacker()
+        candidates = [action for action in actions(battle, hero)
+                      if node is None or action not in node.invalid]
+        while candidates:
+            action = choose(node, candidates)
+            command, target = action
+            status = battle.step(command, battle.participants[target])
+            if status == VICTORY:
+                return action, 1.0
+            if status == DEFEAT:
+                return action, 0.0
+            if status != ONGOING:
+                candidates.remove(action)
+                # only the root is searched from a single known state
+                if node is self.root:
+                    node.invalid.add(action)
+                    node.children.pop(action, None)
+                continue
+            return action, None
+        return None, None
+
+    def _rollout(self, node, candidates):
+        return self.rng.choice(candidates)
+
+    def _playout(self, battle):
+        node = self.root
+        path = [node]
+        depth = 0
+        value = None
+        # selection and expansion
+        while value is None and depth < self.depth:
+            action, value = self._step(battle, node, self._select)
+            if action is None:
+                break
+            depth += 1
+            expanded = action not in node.children
+            node = node.children.setdefault(action, Node())
+            path.append(node)
+            if expanded:
+                break
+        # random rollout
+        while value is None and depth < self.depth:
+            action, value = self._step(battle, None, self._rollout)
+            if action is None:
+                break
+            depth += 1
+        if value is None:
+            value = evaluate(battle)
+        for node in path:
+            node.visits += 1
+            node.value += value
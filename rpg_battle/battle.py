@@ -1,28 +1,573 @@
+import heapq
+import random
+from operator import attrgetter
+
 from .heroes import Hero
 from .monsters import Monster
 from .exceptions import *
+from . import events
+from .events import Event
+from .dispatch import FIGHT, dispatch
+
+
+# mutable per-unit fields captured by Battle.snapshot
+HERO_STATE = ('hp', 'mp', 'maxhp', 'maxmp', 'xp', 'level',
+              'strength', 'constitution', 'intelligence', 'speed')
+MONSTER_STATE = ('hp', 'maxhp', 'level',
+                 'strength', 'constitution', 'intelligence', 'speed',
+                 'command_index')
+_hero_state = attrgetter(*HERO_STATE)
+_monster_state = attrgetter(*MONSTER_STATE)
+
+# Battle.step statuses
+ONGOING = 0
+VICTORY = 1
+DEFEAT = 2
+INSUFFICIENT_MP = 3
+INVALID_TARGET = 4
+INVALID_COMMAND = 5
+
+# exceptions raised by the exception based API for each status
+EXCEPTIONS = {
+    VICTORY: Victory,
+    DEFEAT: Defeat,
+    INSUFFICIENT_MP: InsufficientMP,
+    INVALID_TARGET: InvalidTarget,
+    INVALID_COMMAND: InvalidCommand,
+}
+_STATUSES = {
+    InsufficientMP: INSUFFICIENT_MP,
+    InvalidTarget: INVALID_TARGET,
+}
+
+
+class _Mask(object):
+    """
+    Cached ability availability of one hero: the abilities its mp affords
+    and, for abilities with a target precondition, the targets meeting it.
+    dirty holds the units changed since the targets were last checked.
+    """
+    __slots__ = ('mp', 'affordable', 'targets', 'dirty')
+
+    def __init__(self):
+        self.mp = None
+        self.affordable = ()
+        self.targets = {}
+        self.dirty = set()
 
 
 class Battle(object):
-    def __init__(self, participants):
+    def __init__(self, participants, headless=False, seed=None, waves=None):
         """
         determines initiative order using unit speed
+
+        The initiative queue is a heap of (round, -speed, index) entries.
+        A unit that has taken its turn is pushed back into the next round,
+        so the front of the heap is always the next unit to act. Dead units
+        are not removed eagerly, they are dropped once they reach the front.
+
+        A headless battle returns lists of Event tuples from start and
+        execute_command instead of rendering them into a text log.
+
+        Monster targeting draws from the battle's own random stream. With
+        the seed, the initial participants and the hero commands a battle
+        can be rebuilt with Battle.replay. initial_states keeps the class
+        and stats each participant started with.
+
+        waves is an optional iterable of monster lists (see waves.waves).
+        Whenever the monster side is wiped out the next wave joins the
+        battle at the current round, and Victory is only raised once the
+        waves run out. Waves are pulled lazily, one at a time. The dead
+        monsters are dropped from participants when the next step starts,
+        so participant indexes (as in events and commands) only hold until
+        then.
+        """
+        self.participants = list(participants)
+        self.headless = headless
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.commands = []
+        self.outcome = None
+        self.heroes = [unit for unit in self.participants
+                       if isinstance(unit, Hero)]
+        self.monsters = [unit for unit in self.participants
+                         if not isinstance(unit, Hero)]
+        self._index = dict((id(unit), index)
+                           for index, unit in enumerate(self.participants))
+        # (class, HERO_STATE or MONSTER_STATE values) of each initial
+        # participant, the roster Battle.replay starts from
+        self.initial_states = [
+            (type(unit), _hero_state(unit) if isinstance(unit, Hero)
+             else _monster_state(unit)) for unit in self.participants]
+        # participant indexes of the living units on each side, a dead
+        # unit is swap-removed using its slot in its side's list
+        self.alive_heroes = []
+        self.alive_monsters = []
+        self._slot = []
+        for index, unit in enumerate(self.participants):
+            side = (self.alive_heroes if isinstance(unit, Hero)
+                    else self.alive_monsters)
+            self._slot.append(len(side))
+            if not unit.is_dead():
+                side.append(index)
+        self._queue = [(0, -unit.speed, index)
+                       for index, unit in enumerate(self.participants)]
+        heapq.heapify(self._queue)
+        self.events = []
+        self.waves = iter(waves) if waves is not None else None
+        self.wave = 0
+        # log of the waves pulled from here on as [(monsters, starting
+        # states) or None, next entry] cells, so that a restored battle
+        # meets the same waves again. Only snapshots keep older cells.
+        self._log = [None, None]
+        # wave whose predecessors' dead monsters have been dropped
+        self._compacted = 0
+        # hero index -> _Mask, see legal_actions
+        self._masks = {}
+        self.profile = None
+
+    @classmethod
+    def replay(cls, participants, seed, commands, headless=True, waves=None):
+        """
+        rebuilds a battle from its seed, its initial participants and the
+        (command, target index) pairs from battle.commands, survival
+        battles also need the same waves again
+        returns the replayed battle, outcome is set if it has ended
+        """
+        battle = cls(participants, headless=headless, seed=seed, waves=waves)
+        status = battle.step()
+        for command, target in commands:
+            if status != ONGOING:
+                break
+            status = battle.step(command, battle.participants[target])
+        return battle
+
+    def snapshot(self):
+        """
+        returns the mutable battle state (participants, unit stats,
+        monster command queues, initiative queue and random stream) as
+        flat tuples
         """
-        pass
+        units = []
+        for unit in self.participants:
+            if isinstance(unit, Hero):
+                units.append(_hero_state(unit))
+            else:
+                units.append(_monster_state(unit))
+        return (tuple(self.participants), tuple(units), tuple(self._queue),
+                self.rng.getstate(), len(self.commands), self.outcome,
+                tuple(self.alive_heroes), tuple(self.alive_monsters),
+                tuple(self._slot), self.wave, self._log, self._compacted)
+
+    def restore(self, snapshot):
+        """
+        puts the battle back into the state captured by snapshot
+        """
+        (participants, units, queue, rng_state, commands, self.outcome,
+         alive_heroes, alive_monsters, slot, self.wave, self._log,
+         self._compacted) = snapshot
+        relayout = tuple(self.participants) != participants
+        if relayout:
+            # waves joined or were dropped since the snapshot
+            self._set_participants(participants)
+        for index, (unit, state) in enumerate(zip(self.participants, units)):
+            if isinstance(unit, Hero):
+                fields, current = HERO_STATE, _hero_state(unit)
+            else:
+                fields, current = MONSTER_STATE, _monster_state(unit)
+            if current != state:
+                for field, value in zip(fields, state):
+                    setattr(unit, field, value)
+                # legal_actions only checks the restored units again
+                self._changed(index)
+        self._queue = list(queue)
+        self.alive_heroes = list(alive_heroes)
+        self.alive_monsters = list(alive_monsters)
+        self._slot = list(slot)
+        self.rng.setstate(rng_state)
+        del self.commands[commands:]
+        self.events = []
+        if relayout:
+            self._masks = {}
 
     def current_attacker(self):
         """
         returns unit at front of initiative queue
         """
-        pass
+        queue = self._queue
+        participants = self.participants
+        while queue and participants[queue[0][2]].is_dead():
+            heapq.heappop(queue)
+        if queue:
+            return participants[queue[0][2]]
+        return None
+
+    def render(self, batch=None):
+        """
+        returns the text log for a list of events, by default the latest ones
+        """
+        if batch is None:
+            batch = self.events
+        return events.render(batch, self.participants)
 
     def start(self):
-        pass
+        """
+        runs monster turns until a hero has to act, returning the events
+        that happened so far
+        raises Victory or Defeat if the battle ends
+        """
+        return self._raise_for(self.step())
 
     def execute_command(self, command, target):
         """
         causes current hero to execute a command on a target
         raises InvalidCommand if unit does not have that command
         raises InvalidTarget if unit is dead
+        raises Victory or Defeat if the battle ends
+        """
+        return self._raise_for(self.step(command, target))
+
+    def _raise_for(self, status):
+        if status == VICTORY or status == DEFEAT:
+            raise EXCEPTIONS[status](self._output())
+        if status != ONGOING:
+            raise EXCEPTIONS[status]()
+        return self._output()
+
+    def step(self, command=None, target=None):
+        """
+        Non-raising form of start (without a command) and execute_command.
+        Returns a status: ONGOING once a hero has to act, VICTORY, DEFEAT,
+        or INSUFFICIENT_MP, INVALID_TARGET, INVALID_COMMAND if the command
+        could not be executed, in which case nothing happened. The events
+        are left in battle.events.
+        """
+        self.events = []
+        # commands hold the target index the caller saw, from before the
+        # step dropped dead monsters, like the indexes of legal_actions
+        target_index = self._index.get(id(target))
+        if self.wave != self._compacted:
+            self._compact()
+        if command is None:
+            status = self._check_outcome()
+            if status == ONGOING:
+                status = self._resolve()
+            return status
+        if self.outcome is not None:
+            return INVALID_COMMAND
+        hero = self.current_attacker()
+        # monsters share the dispatch tables but only heroes take commands
+        if not isinstance(hero, Hero):
+            return INVALID_COMMAND
+        table = dispatch(type(hero))
+        ability = table.ids.get(command)
+        if ability is None:
+            return INVALID_COMMAND
+        if target.is_dead():
+            return INVALID_TARGET
+        check = table.checks[ability]
+        if check is None:
+            # abilities the class implements itself can only be tried
+            try:
+                self._act(hero, ability, target)
+            except (InsufficientMP, InvalidTarget) as e:
+                self.events = []
+                return _STATUSES[type(e)]
+        else:
+            error = check(hero, target)
+            if error is not None:
+                return _STATUSES[error]
+            self._act(hero, ability, target)
+        self.commands.append((command, target_index))
+        status = self._end_turn(hero, target)
+        if status == ONGOING:
+            status = self._resolve()
+        return status
+
+    def can_use(self, command, target, unit=None):
+        """
+        Returns True if unit (the current attacker by default) can use
+        command on target right now, without trying it. Only heroes take
+        commands, and only while the battle goes on.
+        """
+        if self.outcome is not None:
+            return False
+        if unit is None:
+            unit = self.current_attacker()
+        if not isinstance(unit, Hero):
+            return False
+        table = dispatch(type(unit))
+        ability = table.ids.get(command)
+        if ability is None or target.is_dead():
+            return False
+        check = table.checks[ability]
+        if check is None:
+            return True
+        return check(unit, target) is None
+
+    def enable_profiling(self, profile=None, keep_turns=False):
+        """
+        starts recording per ability statistics and per phase timings into
+        profile, a new profiling.BattleProfile by default, and returns it.
+        A profile may be shared by several battles.
         """
-        pass
+        from .profiling import BattleProfile, instrument
+        if profile is None:
+            profile = BattleProfile(keep_turns)
+        self.profile = profile
+        instrument(self, profile)
+        return profile
+
+    def disable_profiling(self):
+        """
+        stops recording, the battle runs its uninstrumented methods again
+        """
+        from .profiling import uninstrument
+        uninstrument(self)
+        self.profile = None
+
+    def legal_actions(self):
+        """
+        returns every (command, target index) pair the current hero can
+        execute: commands it knows and can pay for, on living targets that
+        meet the command's restrictions. Abilities a class implements
+        itself cannot be checked and are always listed.
+
+        Availability is cached per hero and updated as the battle changes
+        hp and mp; call invalidate after changing units by hand.
+
+        There are none once the battle is over or on a monster's turn.
+        """
+        if self.outcome is not None:
+            return []
+        hero = self.current_attacker()
+        if not isinstance(hero, Hero):
+            return []
+        index = self._queue[0][2]
+        table = dispatch(type(hero))
+        mask = self._masks.get(index)
+        if mask is None:
+            mask = self._masks[index] = _Mask()
+            mask.dirty.update(range(len(self.participants)))
+        if mask.mp != hero.mp:
+            mask.mp = hero.mp
+            mask.affordable = tuple(
+                (command, table.ids[command]) for command in hero.abilities
+                if hero.mp >= table.mp_costs[table.ids[command]])
+        if mask.dirty:
+            dirty = (range(len(self.participants)) if index in mask.dirty
+                     else mask.dirty)
+            for ability in table.targeted:
+                check = table.checks[ability]
+                targets = mask.targets.setdefault(ability, set())
+                for target in dirty:
+                    if check(hero, self.participants[target]) is InvalidTarget:
+                        targets.discard(target)
+                    else:
+                        targets.add(target)
+            mask.dirty.clear()
+
+        living = self.alive_heroes + self.alive_monsters
+        legal = []
+        for command, ability in mask.affordable:
+            targets = mask.targets.get(ability)
+            if targets is None:
+                legal.extend((command, target) for target in living)
+            else:
+                legal.extend((command, target) for target in living
+                             if target in targets)
+        return legal
+
+    def invalidate(self, unit=None):
+        """
+        marks unit (every unit by default) as changed outside the battle,
+        so legal_actions checks it again
+        """
+        if unit is None:
+            self._masks = {}
+        else:
+            self._changed(self._index[id(unit)])
+
+    def _changed(self, index):
+        for mask in self._masks.values():
+            mask.dirty.add(index)
+
+    def _output(self):
+        if self.headless:
+            return self.events
+        return self.render()
+
+    def _resolve(self):
+        """
+        plays monster turns until the unit at the front of the queue is a
+        hero, returns the battle status
+        """
+        while True:
+            unit = self.current_attacker()
+            if isinstance(unit, Hero):
+                self.events.append(Event(events.TURN, self._queue[0][2],
+                                         None, None, None))
+                return ONGOING
+            target = self.participants[self.rng.choice(self.alive_heroes)]
+            self._act(unit, None, target)
+            status = self._end_turn(unit, target)
+            if status != ONGOING:
+                return status
+
+    def _act(self, unit, ability, target):
+        """
+        uses ability on target (monsters use their command queue) and
+        records what happened
+        """
+        target_hp = target.hp
+        unit_hp = unit.hp
+        if ability is None:
+            ability = unit.attack(target)
+        else:
+            dispatch(type(unit)).functions[ability](unit, target)
+
+        actor = self._queue[0][2]
+        target_index = self._index[id(target)]
+        damage = target_hp - target.hp
+        if ability == FIGHT:
+            kind = events.FIGHT
+        elif damage > 0:
+            kind = events.ABILITY
+        elif damage < 0:
+            kind, damage = events.HEAL, -damage
+        else:
+            kind = events.USE
+        self.events.append(Event(kind, actor, ability, target_index, damage))
+        if self._masks:
+            self._changed(actor)
+            self._changed(target_index)
+        if unit is not target and unit.hp < unit_hp:
+            self.events.append(Event(events.SELF_DAMAGE, actor, ability,
+                                     None, unit_hp - unit.hp))
+
+    def _end_turn(self, unit, target):
+        """
+        moves unit to the back of the queue, handles deaths and xp rewards,
+        returns the battle status
+        """
+        self._reschedule(unit)
+        return self._casualties(unit, target)
+
+    def _reschedule(self, unit):
+        turn, _, index = self._queue[0]
+        heapq.heapreplace(self._queue, (turn + 1, -unit.speed, index))
+
+    def _casualties(self, unit, target):
+        for casualty in (target, unit) if unit is not target else (unit,):
+            if not casualty.is_dead():
+                continue
+            index = self._index[id(casualty)]
+            self.events.append(Event(events.DEATH, index, None, None, None))
+            if isinstance(casualty, Hero):
+                self._remove_alive(self.alive_heroes, index)
+            else:
+                self._remove_alive(self.alive_monsters, index)
+                self._reward_xp(casualty.xp())
+        return self._check_outcome()
+
+    def _remove_alive(self, side, index):
+        slot = self._slot[index]
+        last = side.pop()
+        if last != index:
+            side[slot] = last
+            self._slot[last] = slot
+
+    def _reward_xp(self, xp):
+        self.events.append(Event(events.XP, None, None, None, xp))
+        for index in self.alive_heroes:
+            hero = self.participants[index]
+            level = hero.level
+            hero.gain_xp(xp)
+            if hero.level != level:
+                self.events.append(Event(events.LEVEL_UP, index,
+                                         None, None, hero.level))
+                self._changed(index)
+
+    def _next_wave(self):
+        """
+        brings the next monster wave into the battle, returns False if
+        there is none
+        """
+        log = self._log
+        if log[0] is not None:
+            # the battle was restored, meet the same wave again
+            monsters, states = log[0]
+            for monster, state in zip(monsters, states):
+                for field, value in zip(MONSTER_STATE, state):
+                    setattr(monster, field, value)
+        else:
+            if self.waves is None:
+                return False
+            # skip empty waves, only running out of waves ends them
+            monsters = []
+            while not monsters:
+                wave = next(self.waves, None)
+                if wave is None:
+                    return False
+                monsters = list(wave)
+            log[0] = (monsters, [_monster_state(unit) for unit in monsters])
+            log[1] = [None, None]
+        self._log = log[1]
+        self.wave += 1
+        turn = self._queue[0][0] if self._queue else 0
+        for monster in monsters:
+            index = len(self.participants)
+            self.participants.append(monster)
+            self.monsters.append(monster)
+            self._index[id(monster)] = index
+            self._changed(index)
+            self._slot.append(len(self.alive_monsters))
+            if not monster.is_dead():
+                self.alive_monsters.append(index)
+            heapq.heappush(self._queue, (turn, -monster.speed, index))
+        self.events.append(Event(events.WAVE, None, None, None, self.wave))
+        return True
+
+    def _set_participants(self, participants):
+        self.participants[:] = participants
+        self.monsters = [unit for unit in self.participants
+                         if not isinstance(unit, Hero)]
+        self._index = dict((id(unit), index)
+                           for index, unit in enumerate(self.participants))
+
+    def _compact(self):
+        """
+        drops the dead monsters of wiped out waves, renumbering the other
+        participants in the same order so the battle plays on unchanged
+        """
+        self._compacted = self.wave
+        alive = set(self.alive_monsters)
+        keep = [index for index, unit in enumerate(self.participants)
+                if index in alive or isinstance(unit, Hero)]
+        if len(keep) == len(self.participants):
+            return
+        renumber = dict((old, new) for new, old in enumerate(keep))
+        self._slot = [self._slot[old] for old in keep]
+        self._set_participants([self.participants[old] for old in keep])
+        self.alive_heroes = [renumber[index] for index in self.alive_heroes]
+        self.alive_monsters = [renumber[index]
+                               for index in self.alive_monsters]
+        # renumbering keeps the order, so the queue still pops the same way
+        self._queue = [(turn, speed, renumber[index])
+                       for turn, speed, index in self._queue
+                       if index in renumber]
+        heapq.heapify(self._queue)
+        self._masks = {}
+
+    def _check_outcome(self):
+        while not self.alive_monsters and self._next_wave():
+            pass
+        if not self.alive_monsters:
+            self.outcome = Victory
+            return VICTORY
+        if not self.alive_heroes:
+            self.outcome = Defeat
+            return DEFEAT
+        return ONGOING
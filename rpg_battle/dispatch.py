@@ -0,0 +1,74 @@
+"""
+Ability dispatch tables.
+
+Every ability name gets a small integer id the first time it is seen and
+each unit class gets a table, built on first use, mapping the ids of its
+abilities to the unbound functions, their mp costs and, for abilities from
+the registry, the checks telling whether they can be used. Battles run on the
+ids, names are only needed at the public API and when rendering events.
+"""
+from .abilities import REGISTRY
+
+NAMES = []
+IDS = {}
+
+
+def ability_id(name):
+    """
+    Returns the id of an ability name, assigning a new one if necessary
+    """
+    try:
+        return IDS[name]
+    except KeyError:
+        IDS[name] = len(NAMES)
+        NAMES.append(name)
+        return IDS[name]
+
+
+FIGHT = ability_id('fight')
+
+
+class DispatchTable(object):
+    def __init__(self, cls):
+        """
+        Compiles the abilities (heroes) or command queue (monsters) of cls
+        """
+        self.cls = cls
+        self.ids = {}
+        self.functions = {}
+        self.mp_costs = {}
+        # None for abilities the class implements itself
+        self.checks = {}
+        # abilities whose use depends on the target
+        self.targeted = set()
+        names = list(getattr(cls, 'abilities', []))
+        names += [name for name in getattr(cls, 'command_q', [])
+                  if name not in names]
+        for name in names:
+            ability = ability_id(name)
+            self.ids[name] = ability
+            function = self.functions[ability] = getattr(cls, name)
+            registered = REGISTRY.get(name)
+            if (registered is not None and
+                    getattr(function, '__func__', function) is not
+                    registered.method):
+                registered = None
+            self.mp_costs[ability] = registered.mp_cost if registered else 0
+            self.checks[ability] = registered and registered.check
+            if registered and registered.precondition:
+                self.targeted.add(ability)
+        self.commands = tuple(ability_id(name)
+                              for name in getattr(cls, 'command_q', []))
+
+
+_tables = {}
+
+
+def dispatch(cls):
+    """
+    Returns the DispatchTable of cls, building it on first use
+    """
+    table = _tables.get(cls)
+    if table is None:
+        table = _tables[cls] = DispatchTable(cls)
+    return table
@@ -0,0 +1,67 @@
+from collections import namedtuple
+
+from .dispatch import NAMES
+
+# Event kinds
+FIGHT = 0
+ABILITY = 1
+HEAL = 2
+USE = 3
+SELF_DAMAGE = 4
+DEATH = 5
+XP = 6
+LEVEL_UP = 7
+TURN = 8
+WAVE = 9
+
+# A battle event. actor and target are indexes into the battle's participants,
+# ability is the ability id and amount the damage, healing, xp, new level or
+# wave number depending on kind. Fields that do not apply to a kind are None.
+Event = namedtuple('Event', ['kind', 'actor', 'ability', 'target', 'amount'])
+
+_FORMATS = {
+    FIGHT: '{actor} attacks {target} for {amount}!',
+    ABILITY: '{actor} hits {target} with {ability} for {amount} damage!',
+    HEAL: '{actor} heals {target} for {amount}!',
+    USE: '{actor} uses {ability}!',
+    SELF_DAMAGE: '{actor} takes {amount} self-inflicted damage!',
+    DEATH: '{actor} dies!',
+    XP: '{amount} XP rewarded!',
+    LEVEL_UP: '{actor} is now level {amount}!',
+    TURN: "{actor}'s turn!",
+    WAVE: 'Wave {amount} approaches!',
+}
+
+
+def _name(participants, index):
+    if index is None:
+        return None
+    return type(participants[index]).__name__
+
+
+def _number(value):
+    """
+    Drops the fraction from whole floats so 36.0 is rendered as 36
+    """
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def render_event(event, participants):
+    """
+    Returns the human readable line for a single event
+    """
+    return _FORMATS[event.kind].format(
+        actor=_name(participants, event.actor),
+        target=_name(participants, event.target),
+        ability=(event.ability is not None and
+                 NAMES[event.ability].replace('_', ' ')),
+        amount=_number(event.amount))
+
+
+def render(events, participants):
+    """
+    Returns the multi-line log for a list of events
+    """
+    return '\n'.join(render_event(event, participants) for event in events)
@@ -0,0 +1,169 @@
+"""
+Fixed-point stat arithmetic.
+
+In fixed-point mode every stat is stored as an integer scaled by SCALE,
+so a stat of 2.25 is stored as 36. All fractions in the game's stat and
+ability formulas (stat multipliers of 0.25, ability factors of 0.5,
+monster xp divided by 4) are multiples of 1/SCALE, so fixed-point
+results equal the float results exactly, and integer arrays give the same
+bits on every platform and worker.
+
+fixed_formula() rewrites an ability formula over float stats into one
+over fixed-point stats that only uses integer operations.
+"""
+import ast
+import numbers
+from fractions import Fraction
+
+SCALE = 16
+
+
+def to_fixed(value):
+    """
+    Returns value scaled to a fixed-point integer, raising ValueError if
+    it is not a multiple of 1/SCALE
+    """
+    scaled = Fraction(value) * SCALE
+    if scaled.denominator != 1:
+        raise ValueError('{!r} is not a multiple of 1/{}'.format(value, SCALE))
+    return int(scaled)
+
+
+def from_fixed(value):
+    """
+    Returns the number a fixed-point integer stands for, an int if whole
+    """
+    if value % SCALE == 0:
+        return int(value // SCALE)
+    return float(value) / SCALE
+
+
+def trunc(value):
+    """
+    Drops the fraction of fixed-point value(s), rounding towards zero like
+    int() does. Works on ints and numpy integer arrays.
+    """
+    return value - _fmod(value, SCALE)
+
+
+def _fmod(value, modulus):
+    if isinstance(value, numbers.Integral):
+        remainder = abs(value) % modulus
+        return remainder if value >= 0 else -remainder
+    import numpy as np
+    return np.fmod(value, modulus)
+
+
+_OPERATORS = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/'}
+_COMPARISONS = {ast.Eq: '==', ast.NotEq: '!=', ast.Lt: '<', ast.LtE: '<=',
+                ast.Gt: '>', ast.GtE: '>='}
+
+
+def fixed_formula(expression, names):
+    """
+    Returns the source of expression computed on fixed-point values of
+    names. Products and quotients that are not multiples of 1/SCALE are
+    rounded down. The source uses SCALE and trunc from this module.
+    """
+    source, constant = _rewrite(ast.parse(expression, mode='eval').body,
+                                names)
+    if constant is not None:
+        return _scaled(constant)
+    return source
+
+
+# number literal nodes, ast.Num before Python 3.8
+_NUMBERS = tuple(vars(ast)[name] for name in ('Constant', 'Num')
+                 if name in vars(ast))
+
+
+def _constant(node):
+    """
+    Returns the Fraction a literal number node stands for, else None
+    """
+    if not isinstance(node, _NUMBERS):
+        return None
+    value = getattr(node, 'value', getattr(node, 'n', None))
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return Fraction(repr(value))
+
+
+def _scaled(constant):
+    scaled = constant * SCALE
+    if scaled.denominator != 1:
+        raise ValueError('{} is not a multiple of 1/{}'.format(constant, SCALE))
+    return str(int(scaled))
+
+
+def _multiply(source, factor):
+    if factor.denominator == 1:
+        return '({} * {})'.format(source, factor.numerator)
+    if factor.numerator == 1:
+        return '({} // {})'.format(source, factor.denominator)
+    return '({} * {} // {})'.format(source, factor.numerator,
+                                    factor.denominator)
+
+
+def _rewrite(node, names):
+    """
+    Returns (source, None) for a fixed-point subexpression, or
+    (None, Fraction) for a constant one
+    """
+    constant = _constant(node)
+    if constant is not None:
+        return None, constant
+    if isinstance(node, ast.Name) and node.id in names:
+        return node.id, None
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        source, constant = _rewrite(node.operand, names)
+        if constant is not None:
+            return None, -constant
+        return '(-{})'.format(source), None
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        left, left_constant = _rewrite(node.left, names)
+        right, right_constant = _rewrite(node.right, names)
+        op = type(node.op)
+        if left is None and right is None:
+            if op is ast.Add:
+                return None, left_constant + right_constant
+            if op is ast.Sub:
+                return None, left_constant - right_constant
+            if op is ast.Mult:
+                return None, left_constant * right_constant
+            return None, left_constant / right_constant
+        if op in (ast.Add, ast.Sub):
+            return '({} {} {})'.format(
+                _scaled(left_constant) if left is None else left,
+                _OPERATORS[op],
+                _scaled(right_constant) if right is None else right), None
+        if op is ast.Mult:
+            if left is None:
+                return _multiply(right, left_constant), None
+            if right is None:
+                return _multiply(left, right_constant), None
+            return '({} * {} // SCALE)'.format(left, right), None
+        if right is None:
+            return _multiply(left, 1 / right_constant), None
+        if left is None:
+            left = _scaled(left_constant)
+        return '({} * SCALE // {})'.format(left, right), None
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and
+            node.func.id == 'int' and len(node.args) == 1):
+        source, constant = _rewrite(node.args[0], names)
+        if constant is not None:
+            return None, Fraction(int(constant))
+        return 'trunc({})'.format(source), None
+    if isinstance(node, ast.Compare) and len(node.ops) == 1:
+        left, left_constant = _rewrite(node.left, names)
+        right, right_constant = _rewrite(node.comparators[0], names)
+        return '({} {} {})'.format(
+            _scaled(left_constant) if left is None else left,
+            _COMPARISONS[type(node.ops[0])],
+            _scaled(right_constant) if right is None else right), None
+    if isinstance(node, ast.Attribute):
+        source, constant = _rewrite(node.value, names)
+        if source is not None:
+            return '{}.{}'.format(source, node.attr), None
+    raise ValueError('unsupported in fixed-point formulas: {}'.format(
+        ast.dump(node)))
@@ -1,35 +1,164 @@
+import numbers
+
+from .abilities import method
 from .exceptions import *
+from .modifiers import CAP, FLOOR, ModifiedUnit
+from .stats import STAT_TABLE
+
+
+def _growth(mod):
+    """
+    Stat gained per level: 1 plus the modifier if it is positive
+    """
+    return 1 + max(mod, 0)
+
+
+def _half_sum(stat, growth, first, last):
+    """
+    Sum of (stat + growth * j) // 2 for j from first to last
+    """
+    count = last - first + 1
+    total = count * stat + growth * (first + last) * count // 2
+    if growth % 2 == 0:
+        odd = count * (stat % 2)
+    else:
+        parity = (stat + 1) % 2
+        odd = (last - parity) // 2 - (first - 1 - parity) // 2
+    return (total - odd) // 2
+
+
+def _grow(total, stat, growth, levels):
+    """
+    maxhp/maxmp after levels level ups adding half of a stat that grows
+    by growth each level, dropping fractions every time
+    """
+    total = int(total + 0.5 * (stat + growth))
+    return total + _half_sum(stat, growth, 2, levels)
+
+
+def xp_for_levels(level, levels):
+    """
+    Total xp needed to gain levels levels starting from level
+    """
+    return 10 * (levels * level + levels * (levels - 1) // 2)
+
+
+def levels_for_xp(level, xp):
+    """
+    Number of levels an xp total buys starting from level
+    """
+    high = 1
+    while xp_for_levels(level, high) <= xp:
+        high *= 2
+    low = 0
+    while high - low > 1:
+        middle = (low + high) // 2
+        if xp_for_levels(level, middle) <= xp:
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+class Hero(ModifiedUnit):
+    # per-instance state only, class constants such as abilities and the
+    # stat modifiers stay on the class. _start_level is the level reset()
+    # goes back to.
+    __slots__ = ('level', 'strength', 'constitution', 'intelligence',
+                 'speed', 'xp', 'hp', 'mp', 'maxhp', 'maxmp', '_start_level')
+
+    abilities = ['fight']
+    # hp does not drop below 0 nor heal beyond maxhp
+    damage_modifiers = (FLOOR,)
+    healing_modifiers = (CAP,)
+    strengthMod = 0
+    intMod = 0
+    constMod = 0
+    speedMod = 0
 
-class Hero(object):
-    
     def __init__(self, level=1):
         """
-        Sets stats up and levels up hero if necessary.
+        Sets stats up and levels up hero if necessary, copying them from
+        the stat table.
         """
-        self.level = level
-        self.strength = 6 
-        self.constitution = 6 
-        self.intelligence = 6 
-        self.speed = 6 
-        self.xp = 0
-        self.hp = 100 + 0.5 * self.constitution
-        self.mp = 50 + 0.5 * self.intelligence
-        self.maxhp = self.hp
-        self.maxmp =self.mp
-        self.strengthMod = 0
-        self.intMod = 0
-        self.constMod = 0
-        self.speedMod = 0
-        
-        for x in range(1,level):
-            self.level_up()
-            
-        self.level = level
-        self.xp = 0
-        
-        
-        
-    def level_up(self):
+        self.reset(level)
+
+    def reset(self, level=None):
+        """
+        Restores the stats of a new hero of this class at level, by default
+        the level the hero was created at, undoing damage, xp, level ups
+        and lost maxhp
+        """
+        if level is None:
+            level = self._start_level
+        self._start_level = level
+        (self.level, self.strength, self.constitution, self.intelligence,
+         self.speed, self.xp, self.hp, self.mp, self.maxhp,
+         self.maxmp) = STAT_TABLE.row(type(self), level)
+
+    @classmethod
+    def base_stats(cls, level):
+        """
+        Computes the starting stats of a hero of this class at level, as
+        a tuple in __slots__ order
+        """
+        hero = cls.__new__(cls)
+        hero.level = 1
+        hero.strength = 6 + cls.strengthMod
+        hero.constitution = 6 + cls.constMod
+        hero.intelligence = 6 + cls.intMod
+        hero.speed = 6 + cls.speedMod
+        hero.xp = 0
+        hero.hp = int(100 + 0.5 * hero.constitution)
+        hero.mp = int(50 + 0.5 * hero.intelligence)
+        hero.maxhp = hero.hp
+        hero.maxmp = hero.mp
+
+        hero.level_up(level - 1)
+
+        hero.level = level
+        hero.xp = 0
+        return tuple(getattr(hero, field) for field in Hero.__slots__[:-1])
+
+    def level_up(self, levels=1):
+        """
+        Gains levels, one by default, spending the xp they require and
+        restoring hp and mp. Several levels are gained in closed form with
+        the same results as levelling up one level at a time.
+        """
+        if levels > 1 and self._closed_form():
+            level = self.level
+            self.xp = self.xp - xp_for_levels(level, levels)
+            self.level = level + levels
+            growth = _growth(self.constMod)
+            self.maxhp = _grow(self.maxhp, self.constitution, growth, levels)
+            self.constitution += levels * growth
+            growth = _growth(self.intMod)
+            self.maxmp = _grow(self.maxmp, self.intelligence, growth, levels)
+            self.intelligence += levels * growth
+            self.strength += levels * _growth(self.strengthMod)
+            self.speed += levels * _growth(self.speedMod)
+            self.hp = self.maxhp
+            self.mp = self.maxmp
+            return
+        for x in range(levels):
+            self._level_up_once()
+
+    def _closed_form(self):
+        """
+        Returns True if levelling up can be computed in closed form: the
+        standard xp curve, whole stats and nothing negative to truncate
+        """
+        if type(self).xp_for_next_level != Hero.xp_for_next_level:
+            return False
+        values = (self.strength, self.constitution, self.intelligence,
+                  self.speed, self.strengthMod, self.constMod, self.intMod,
+                  self.speedMod)
+        return (all(isinstance(value, numbers.Integral) for value in values)
+                and min(self.constitution, self.intelligence,
+                        self.maxhp, self.maxmp) >= 0)
+
+    def _level_up_once(self):
         self.xp = self.xp - self.xp_for_next_level()
         self.level += 1 
         
@@ -66,12 +195,7 @@ class Hero(object):
         """
         return(10*self.level)
 
-    def fight(self, target):
-        """
-        Attacks target, dealing damage equal to the user's strength.
-        """
-        damage = self.strength
-        target.take_damage(damage)
+    fight = method('fight')
 
     def gain_xp(self, xp):
         """
@@ -81,28 +205,13 @@ class Hero(object):
         then have an xp total of 2.
         """
         self.xp += xp
-        
+
+        if type(self).xp_for_next_level == Hero.xp_for_next_level:
+            self.level_up(levels_for_xp(self.level, self.xp))
+            return
         while (self.xp >= self.xp_for_next_level()): 
-            """is this the correct way to call xp_for_next_level?"""
             self.level_up()
         
-    def take_damage(self, damage):
-        """
-        Reduce hp by damage taken.
-        """
-        self.hp -= damage
-        if (self.hp < 0):
-            self.hp = 0
-
-    def heal_damage(self, healing):
-        """
-        Increase hp by healing but not exceeding maxhp
-        """
-        self.hp += healing
-        if (self.hp > self.maxhp):
-            self.hp = self.maxhp
-            
-
     def is_dead(self):
         """
         Returns True if out of hp
@@ -118,50 +227,16 @@ class Warrior(Hero):
     constitution +2
     speed -1
     """
-    def __init__(self, level = 1):
-        super(Warrior, self).__init__()
-        self.strengthMod = 1
-        self.intMod = -2
-        self.constMod = 2
-        self.speedMod = -1
-        self.strength += self.strengthMod
-        self.constitution += self.constMod 
-        self.intelligence += self.intMod
-        self.speed += self.speedMod 
-        self.hp = 100 + 0.5 * self.constitution
-        self.mp = 50 + 0.5 * self.intelligence
-        self.hp = int(self.hp)
-        self.mp = int(self.mp)
-        self.maxhp = self.hp
-        self.maxmp =self.mp
-        self.abilities = ['fight', 'shield_slam', 'reckless_charge']
-        
-        for x in range(1,level):
-            self.level_up()
-            
-        self.level = level
-        self.xp = 0
-        
-    
-    def shield_slam(self, target):
-        """
-        cost: 5 mp
-        damage: 1.5 * strength
-        """
-        if (self.mp >= 5):
-            self.mp -= 5
-            target.take_damage(int(1.5*self.strength))
-        else:
-            raise InsufficientMP()
+    __slots__ = ()
+    abilities = ['fight', 'shield_slam', 'reckless_charge']
 
-    def reckless_charge(self, target):
-        """
-        cost: 4 hp
-        damage: 1.5 * strength
-        """
-    
-        target.take_damage(2*self.strength)
-        self.hp -= 4
+    strengthMod = 1
+    intMod = -2
+    constMod = 2
+    speedMod = -1
+
+    shield_slam = method('shield_slam')
+    reckless_charge = method('reckless_charge')
 
 class Mage(Hero):
     """
@@ -170,50 +245,15 @@ class Mage(Hero):
     intelligence +3
     constitution -2
     """
-    def __init__(self, level = 1):
-        super(Mage, self).__init__()
-        self.strengthMod = -2
-        self.intMod = 3
-        self.constMod = -2
-        self.strength += self.strengthMod
-        self.constitution += self.constMod 
-        self.intelligence += self.intMod
-        self.speed += self.speedMod 
-        self.hp = 100 + 0.5 * self.constitution
-        self.mp = 50 + 0.5 * self.intelligence
-        self.hp = int(self.hp)
-        self.mp = int(self.mp)
-        self.maxhp = self.hp
-        self.maxmp =self.mp
-        self.abilities = ['fight', 'fireball', 'frostbolt']
-        
-        for x in range(1,level):
-            self.level_up()
-            
-        self.level = level
-        self.xp = 0
-        
-    def fireball(self, target):
-        """
-        cost: 8 mp
-        damage: 6 + (0.5 * intelligence)
-        """
-        if (self.mp >= 8):
-            self.mp -= 8
-            target.take_damage(int(6+(.5*self.intelligence)))
-        else:
-            raise InsufficientMP()        
+    __slots__ = ()
+    abilities = ['fight', 'fireball', 'frostbolt']
 
-    def frostbolt(self, target):
-        """
-        cost: 3 mp
-        damage: 3 + level
-        """
-        if (self.mp >= 3):
-            self.mp -= 3
-            target.take_damage(3 + self.level)
-        else:
-            raise InsufficientMP()
+    strengthMod = -2
+    intMod = 3
+    constMod = -2
+
+    fireball = method('fireball')
+    frostbolt = method('frostbolt')
 
 class Cleric(Hero):
     """
@@ -221,50 +261,15 @@ class Cleric(Hero):
     speed -1
     constitution +1
     """
+    __slots__ = ()
     
-    def __init__(self, level = 1):
-        super(Cleric, self).__init__()
-        self.constMod = 1
-        self.speedMod = -1
-        self.strength += self.strengthMod
-        self.constitution += self.constMod 
-        self.intelligence += self.intMod
-        self.speed += self.speedMod  
-        self.hp = 100 + 0.5 * self.constitution
-        self.mp = 50 + 0.5 * self.intelligence
-        self.hp = int(self.hp)
-        self.mp = int(self.mp)
-        self.maxhp = self.hp
-        self.maxmp =self.mp
-        self.abilities = ['fight', 'heal', 'smite']
-        
-        for x in range(1,level):
-            self.level_up()
-            
-        self.level = level
-        self.xp = 0
+    abilities = ['fight', 'heal', 'smite']
 
-    def heal(self, target):
-        """
-        cost: 4 mp
-        healing: constitution
-        """
-        if (self.mp >= 4):
-            self.mp -= 4
-            target.heal_damage(self.constitution)
-        else:
-            raise InsufficientMP()
+    constMod = 1
+    speedMod = -1
 
-    def smite(self, target):
-        """
-        cost: 7 mp
-        damage: 4 + (0.5 * (intelligence + constitution))
-        """
-        if (self.mp >= 7):
-            self.mp -= 7
-            target.take_damage(int(4 + (0.5 * (self.intelligence + self.constitution))))
-        else:
-            raise InsufficientMP()
+    heal = method('heal')
+    smite = method('smite')
 
 class Rogue(Hero):
     """
@@ -274,51 +279,13 @@ class Rogue(Hero):
     intelligence -1
     constitution -2
     """
-    def __init__(self, level = 1):
-        super(Rogue, self).__init__()
-        self.level = level
-        self.strengthMod = 1
-        self.intMod = -1
-        self.constMod = -2
-        self.speedMod = 2
-        self.strength += self.strengthMod
-        self.constitution += self.constMod 
-        self.intelligence += self.intMod
-        self.speed += self.speedMod
-        self.hp = 100 + 0.5 * self.constitution
-        self.mp = 50 + 0.5 * self.intelligence
-        self.hp = int(self.hp)
-        self.mp = int(self.mp)
-        self.maxhp = self.hp
-        self.maxmp =self.mp
-        self.abilities = ['fight', 'backstab', 'rapid_strike']
-        
-        for x in range(1,level):
-            self.level_up()
-            
-        self.level = level
-        self.xp = 0
-        
-
-    def backstab(self, target):
-        """
-        cost: None
-        restriction: target must be undamaged, else raise InvalidTarget
-        damage: 2 * strength
-        """
-        if (target.hp == target.maxhp):
-            target.take_damage(2*self.strength)
-        else:
-            raise InvalidTarget()
+    __slots__ = ()
+    abilities = ['fight', 'backstab', 'rapid_strike']
 
-    def rapid_strike(self, target):
-        """
-        cost: 5 mp
-        damage: 4 + speed
-        """
-        if (self.mp >= 5):
-            self.mp -= 5
-            target.take_damage(4 + self.speed)
-        else:
-            raise InsufficientMP()
+    strengthMod = 1
+    intMod = -1
+    constMod = -2
+    speedMod = 2
 
+    backstab = method('backstab')
+    rapid_strike = method('rapid_strike')
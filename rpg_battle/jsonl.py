@@ -0,0 +1,175 @@
+"""
+Streaming JSON Lines import and export.
+
+Rosters, encounter definitions and finished battle summaries are written
+one JSON object per line. Readers are generators yielding one object at a
+time and writers consume any iterable, joining batch lines per write, so
+both run in constant memory however long the stream is. Paths ending in
+.gz are gzip compressed.
+
+A unit line holds its class name and stats:
+
+    {"class": "Mage", "level": 4, "hp": 85, ...}
+
+Only "class" is required. A line with just a class and a level, such as an
+encounter definition, builds a fresh unit of that level, and any stats
+present override the fresh ones.
+"""
+import gzip
+import io
+import json
+
+from .battle import HERO_STATE, MONSTER_STATE, Battle
+from .heroes import Hero
+from .records import CLASSES
+from .simulate import SimulationResult
+
+HERO_STATS = ('level', 'xp', 'hp', 'maxhp', 'mp', 'maxmp', 'strength',
+              'constitution', 'intelligence', 'speed')
+MONSTER_STATS = ('level', 'hp', 'maxhp', 'strength', 'constitution',
+                 'intelligence', 'speed', 'command_index')
+
+_CLASSES = dict((cls.__name__, cls) for cls in CLASSES)
+
+
+def _open(path, mode):
+    """
+    Opens path for reading ('r') or writing ('w') bytes, through gzip if
+    the name ends in .gz
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 'b')
+    return io.open(path, mode + 'b')
+
+
+def write(path, objects, batch=1000):
+    """
+    Writes JSON serializable objects to path, one per line. Returns the
+    number of objects written.
+    """
+    count = 0
+    with _open(path, 'w') as f:
+        lines = []
+        for value in objects:
+            lines.append(json.dumps(value, sort_keys=True))
+            if len(lines) == batch:
+                f.write(('\n'.join(lines) + '\n').encode('utf-8'))
+                count += len(lines)
+                lines = []
+        if lines:
+            f.write(('\n'.join(lines) + '\n').encode('utf-8'))
+            count += len(lines)
+    return count
+
+
+def read(path):
+    """
+    Yields the objects of path, one per line, skipping blank lines. Battle
+    summaries are read back with it as plain dicts.
+    """
+    with _open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line.decode('utf-8'))
+
+
+def unit_to_dict(unit):
+    """
+    Returns the JSON object of a hero or monster
+    """
+    stats = HERO_STATS if isinstance(unit, Hero) else MONSTER_STATS
+    data = dict((stat, getattr(unit, stat)) for stat in stats)
+    data['class'] = type(unit).__name__
+    return data
+
+
+def unit_from_dict(data, classes=_CLASSES):
+    """
+    Builds a unit from its JSON object, classes maps class names to unit
+    classes
+    """
+    try:
+        cls = classes[data['class']]
+    except KeyError:
+        raise ValueError('unknown unit class {!r}'.format(data.get('class')))
+    unit = cls(level=data.get('level', 1))
+    stats = HERO_STATS if issubclass(cls, Hero) else MONSTER_STATS
+    for stat in stats:
+        if stat in data:
+            setattr(unit, stat, data[stat])
+    return unit
+
+
+def write_units(path, units, batch=1000):
+    """
+    Writes heroes and monsters to path, returns the number written
+    """
+    return write(path, (unit_to_dict(unit) for unit in units), batch)
+
+
+def read_units(path, classes=_CLASSES):
+    """
+    Yields the units of path
+    """
+    for data in read(path):
+        yield unit_from_dict(data, classes)
+
+
+def battle_summary(battle):
+    """
+    Returns the JSON object of a battle: its outcome ('Victory', 'Defeat'
+    or None while it goes on), the seed, initial roster and hero commands
+    that replay it (see replay_summary), the survival wave reached and
+    every participant as it is now
+    """
+    roster = []
+    for cls, state in battle.initial_states:
+        fields = HERO_STATE if issubclass(cls, Hero) else MONSTER_STATE
+        data = dict(zip(fields, state))
+        data['class'] = cls.__name__
+        roster.append(data)
+    return {
+        'outcome': battle.outcome and battle.outcome.__name__,
+        'seed': battle.seed,
+        'wave': battle.wave,
+        'roster': roster,
+        'commands': [list(command) for command in battle.commands],
+        'participants': [unit_to_dict(unit) for unit in battle.participants],
+    }
+
+
+def replay_summary(summary, classes=_CLASSES, waves=None):
+    """
+    Replays the battle of a summary with Battle.replay, survival battles
+    also need the same waves again
+    """
+    return Battle.replay([unit_from_dict(data, classes)
+                          for data in summary['roster']],
+                         summary['seed'], summary['commands'], waves=waves)
+
+
+def result_summary(result):
+    """
+    Returns the JSON object of a simulate.SimulationResult
+    """
+    return {
+        'runs': result.runs,
+        'wins': result.wins,
+        'losses': result.losses,
+        'draws': result.draws,
+        'turns': dict((str(turns), count)
+                      for turns, count in result.turns.items()),
+        'damage': list(result.damage),
+    }
+
+
+def write_battles(path, battles, batch=1000):
+    """
+    Writes the summaries of battles, Battle or SimulationResult objects,
+    to path. Returns the number written.
+    """
+    return write(path, (result_summary(battle)
+                        if isinstance(battle, SimulationResult)
+                        else battle_summary(battle) for battle in battles),
+                 batch)
@@ -0,0 +1,165 @@
+"""
+Damage and healing modifier pipelines.
+
+Units declare how incoming damage and healing change their hp as two class
+attributes, damage_modifiers and healing_modifiers: tuples of operations
+applied in order. Subclasses compose them explicitly, for example
+Monster.damage_modifiers + (reduce(5),). Each class's pipeline is resolved
+once, when the class is created, into generated take_damage/heal_damage
+methods, and can be applied column-wise to numpy arrays of units of mixed
+classes.
+
+Operations:
+    reduce(n)  amount -= n, nothing happens unless the result is positive
+    INVERT     amount = -amount
+    FLOOR      hp does not drop below 0
+    CAP        hp does not exceed maxhp
+
+reduce and INVERT act on the amount before hp changes, FLOOR and CAP on hp
+after it.
+"""
+
+INVERT = ('invert', None)
+FLOOR = ('floor', None)
+CAP = ('cap', None)
+
+_AMOUNT_OPS = ('reduce', 'invert')
+
+
+def reduce(amount):
+    return ('reduce', amount)
+
+
+def _order(operations):
+    """
+    Amount operations in declared order, then hp operations
+    """
+    return ([op for op in operations if op[0] in _AMOUNT_OPS] +
+            [op for op in operations if op[0] not in _AMOUNT_OPS])
+
+
+class Pipeline(object):
+    def __init__(self, cls):
+        """
+        Resolves the damage_modifiers and healing_modifiers of cls
+        """
+        self.cls = cls
+        self.damage = _order(getattr(cls, 'damage_modifiers', ()))
+        self.healing = _order(getattr(cls, 'healing_modifiers', ()))
+        self.take_damage = self._compile('take_damage', self.damage, '-=')
+        self.heal_damage = self._compile('heal_damage', self.healing, '+=')
+
+    @staticmethod
+    def _compile(name, operations, change):
+        """
+        Generates the unit method for operations, which are in _order
+        """
+        body = []
+        indent = ''
+        changed = False
+        for op, argument in operations:
+            if op not in _AMOUNT_OPS and not changed:
+                body.append('{}self.hp {} amount'.format(indent, change))
+                changed = True
+            if op == 'reduce':
+                body += ['{}amount = amount - {!r}'.format(indent, argument),
+                         '{}if amount > 0:'.format(indent)]
+                indent += '    '
+            elif op == 'invert':
+                body.append('{}amount = -amount'.format(indent))
+            elif op == 'floor':
+                body += ['{}if self.hp < 0:'.format(indent),
+                         '{}    self.hp = 0'.format(indent)]
+            elif op == 'cap':
+                body += ['{}if self.hp > self.maxhp:'.format(indent),
+                         '{}    self.hp = self.maxhp'.format(indent)]
+        if not changed:
+            body.append('{}self.hp {} amount'.format(indent, change))
+        source = 'def {}(self, amount):\n{}\n'.format(
+            name, '\n'.join('    ' + line for line in body))
+        namespace = {}
+        exec(compile(source, '<modifiers {}>'.format(name), 'exec'), namespace)
+        function = namespace[name]
+        function.modifiers = operations
+        function.__doc__ = '\n{} hp by the amount, modifiers: {}\n'.format(
+            'Reduce' if change == '-=' else 'Increase',
+            ', '.join(op if argument is None else '{}({})'.format(op, argument)
+                      for op, argument in operations) or 'none')
+        return function
+
+    def apply(self, kind, hp, maxhp, amount, scale=1):
+        """
+        Returns hp after a kind ('damage' or 'healing') of amount, for
+        numpy columns of units of this class. Fixed-point columns pass
+        their scale, see fixed.SCALE.
+        """
+        import numpy as np
+        operations = self.damage if kind == 'damage' else self.healing
+        amount = np.asarray(amount, dtype=float if scale == 1 else None)
+        changed = np.ones(np.shape(hp), dtype=bool)
+        for op, argument in operations:
+            if op == 'reduce':
+                amount = amount - argument * scale
+                changed &= amount > 0
+            elif op == 'invert':
+                amount = -amount
+        if kind == 'damage':
+            amount = -amount
+        # like the generated methods, hp operations only follow a change
+        hp = np.where(changed, hp + amount, hp)
+        for op, _ in operations:
+            if op == 'floor':
+                hp = np.where(changed, np.maximum(hp, 0), hp)
+            elif op == 'cap':
+                hp = np.where(changed, np.minimum(hp, maxhp), hp)
+        return hp
+
+
+_pipelines = {}
+
+
+def pipeline(cls):
+    """
+    Returns the Pipeline of cls, resolving it on first use
+    """
+    resolved = _pipelines.get(cls)
+    if resolved is None:
+        resolved = _pipelines[cls] = Pipeline(cls)
+    return resolved
+
+
+def apply_columns(kind, classes, class_id, hp, maxhp, amount, scale=1):
+    """
+    Returns hp after a kind ('damage' or 'healing') of amount for numpy
+    columns of units whose classes are classes[class_id]. Fixed-point
+    columns keep their integer dtype.
+    """
+    import numpy as np
+    dtype = float if scale == 1 else None
+    hp = np.array(hp, dtype=dtype)
+    amount = np.broadcast_to(np.asarray(amount, dtype=dtype), hp.shape)
+    for index in np.unique(class_id):
+        rows = class_id == index
+        hp[rows] = pipeline(classes[index]).apply(kind, hp[rows], maxhp[rows],
+                                                  amount[rows], scale)
+    return hp
+
+
+class ModifierMeta(type):
+    """
+    Installs the compiled take_damage/heal_damage of every new class,
+    unless the class or a parent defines its own
+    """
+    def __init__(cls, name, bases, namespace):
+        super(ModifierMeta, cls).__init__(name, bases, namespace)
+        resolved = pipeline(cls)
+        for method in ('take_damage', 'heal_damage'):
+            if method in namespace:
+                continue
+            inherited = getattr(cls, method, None)
+            if inherited is None or hasattr(inherited, 'modifiers'):
+                setattr(cls, method, getattr(resolved, method))
+
+
+# base class of units with modifier pipelines
+ModifiedUnit = ModifierMeta('ModifiedUnit', (object,), {'__slots__': ()})
@@ -1,24 +1,57 @@
+from .abilities import method
 from .exceptions import *
+from .dispatch import dispatch
+from .modifiers import CAP, INVERT, ModifiedUnit, reduce
+from .stats import STAT_TABLE
+
+class Monster(ModifiedUnit):
+    # per-instance state only, class constants such as the multipliers and
+    # command_q stay on the class. _commands caches the bound command queue
+    # and is rebuilt on demand, it is not part of the pickled state.
+    __slots__ = ('level', 'strength', 'constitution', 'intelligence',
+                 'speed', 'maxhp', 'hp', 'command_index', '_commands')
 
-class Monster(object):
-    
     strMult = 1
     constMult = 1
     intMult = 1
     spdMult = 1
     init_hp = 10
+    command_q = ['fight']
+    # hp may drop below 0, healing does not exceed maxhp
+    damage_modifiers = ()
+    healing_modifiers = (CAP,)
     
     def __init__(self, level=1):
         """
-        Sets up stats and levels up the monster if necessary
+        Sets up stats and levels up the monster if necessary, copying them
+        from the stat table
+        """
+        self.reset(level)
+
+    def reset(self, level=None):
+        """
+        Restores the stats of a new monster of this class at level, by
+        default its own level, and restarts its command queue
+        """
+        if level is None:
+            level = self.level
+        (self.level, self.strength, self.constitution, self.intelligence,
+         self.speed, self.maxhp, self.hp,
+         self.command_index) = STAT_TABLE.row(type(self), level)
+
+    @classmethod
+    def base_stats(cls, level):
+        """
+        Computes the starting stats of a monster of this class at level,
+        as a tuple in __slots__ order
         """
-        self.level = level
-        self.strength = (7 + self.level) * self.strMult
-        self.constitution = (7 + self.level) * self.constMult
-        self.intelligence = (7 + self.level) * self.intMult
-        self.speed = (7 + self.level) * self.spdMult
-        self.maxhp = int(self.init_hp + (self.level - 1) * (0.5 * self.constitution))
-        self.hp = self.maxhp
+        strength = (7 + level) * cls.strMult
+        constitution = (7 + level) * cls.constMult
+        intelligence = (7 + level) * cls.intMult
+        speed = (7 + level) * cls.spdMult
+        maxhp = int(cls.init_hp + (level - 1) * (0.5 * constitution))
+        return (level, strength, constitution, intelligence, speed,
+                maxhp, maxhp, 0)
         
 
     def xp(self):
@@ -30,38 +63,49 @@ class Monster(object):
         return xp
         
 
-    def fight(self, target):
-        """
-        Attacks target dealing damage equal to strength
-        """
-        target.take_damage(self.strength)
-
+    fight = method('fight')
 
-    def take_damage(self, damage):
+    def is_dead(self):
         """
-        Reduce hp by damage taken.
+        Returns True if out of hp
         """
-        self.hp -= damage
+        return self.hp <= 0
 
-    def heal_damage(self, healing):
-        """
-        Increase hp by healing but not exceeding maxhp
-        """
-        self.hp += healing
-        if self.hp > self.maxhp:
-            self.hp = self.maxhp
+    def __getstate__(self):
+        return dict((field, getattr(self, field)) for field in _STATE)
 
-    def is_dead(self):
+    def __setstate__(self, state):
+        for field, value in state.items():
+            setattr(self, field, value)
+
+    def _bind_commands(self):
         """
-        Returns True if out of hp
+        Returns the command queue as (ability id, bound method) pairs
         """
-        return self.hp <= 0
+        table = dispatch(type(self))
+        self._commands = tuple(
+            (ability, table.functions[ability].__get__(self, type(self)))
+            for ability in table.commands)
+        return self._commands
 
     def attack(self, target):
         """
-        Attacks target using next ability in command queue
+        Attacks target using next ability in command queue, cycling
+        that ability to the end of the queue. Returns the ability id used.
+        command_index counts the attacks made, it is the only state of the
+        cycle.
         """
-        pass
+        try:
+            commands = self._commands
+        except AttributeError:
+            commands = self._bind_commands()
+        ability, function = commands[self.command_index % len(commands)]
+        self.command_index += 1
+        function(target)
+        return ability
+
+
+_STATE = Monster.__slots__[:-1]
 
 
 class Dragon(Monster):
@@ -70,23 +114,13 @@ class Dragon(Monster):
     constitution multiplier: 2
     special feature: Reduce all damage taken by 5
     """
+    __slots__ = ()
     constMult = 2
     init_hp = 100
+    damage_modifiers = Monster.damage_modifiers + (reduce(5),)
     
 
-    def tail_swipe(self, target):
-        """
-        damage: strength + speed
-        """
-        target.take_damage(self.strength + self.speed)
-    
-    def take_damage(self, damage):
-        """
-        Reduce hp by damage taken.
-        """
-        damage -= 5
-        if (damage > 0): 
-            self.hp -= damage
+    tail_swipe = method('tail_swipe')
 
 
 class RedDragon(Dragon):
@@ -95,15 +129,12 @@ class RedDragon(Dragon):
     intelligence multiplier: 1.5
     command queue: fire_breath, tail_swipe, fight
     """
+    __slots__ = ()
     strMult = 2
     intMult = 1.5
     command_q = ['fire_breath', 'tail_swipe', 'fight']
 
-    def fire_breath(self, target):
-        """
-        damage: intelligence * 2.5
-        """
-        target.take_damage(self.intelligence * 2.5)
+    fire_breath = method('fire_breath')
 
 
 class GreenDragon(Dragon):
@@ -112,15 +143,12 @@ class GreenDragon(Dragon):
     speed multiplier: 1.5
     command queue: poison_breath, tail_swipe, fight
     """
+    __slots__ = ()
     strMult = 1.5
     spdMult = 1.5
     command_q = ['poison_breath', 'tail_swipe', 'fight']
     
-    def poison_breath(self, target):
-        """
-        damage: (intelligence + constitution) * 1.5
-        """
-        target.take_damage((self.intelligence + self.constitution) * 1.5)
+    poison_breath = method('poison_breath')
 
 
 class Undead(Monster):
@@ -128,22 +156,13 @@ class Undead(Monster):
     constitution multiplier: 0.25
     special feature: undead take damage from healing except their own healing abilities
     """
+    __slots__ = ()
     constMult = 0.25
+    # healing decreases hp
+    healing_modifiers = (INVERT,)
         
 
-    def life_drain(self, target):
-        """
-        damage: intelligence * 1.5
-        heals unit for damage done
-        """
-        target.take_damage(self.intelligence * 1.5)
-        Monster.heal_damage(self, self.intelligence * 1.5)
-        
-    def heal_damage(self, healing):
-        """
-        decreases hp by healing 
-        """
-        self.hp -= healing
+    life_drain = method('life_drain')
 
 
 class Vampire(Undead):
@@ -152,21 +171,13 @@ class Vampire(Undead):
     intelligence multiplier: 2
     command queue: fight, bite, life_drain
     """
+    __slots__ = ()
     
     init_hp = 30
     intMult = 2
     command_q = ['fight', 'bite', 'life_drain']
     
-    def bite(self, target):
-        """
-        damage: speed * 0.5
-        also reduces target's maxhp by amount equal to damage done
-        heals unit for damage done
-        """
-        bite_damage = self.speed * 0.5
-        target.take_damage(bite_damage)
-        target.maxhp -= bite_damage
-        Monster.heal_damage(self, bite_damage)
+    bite = method('bite')
         
 
 
@@ -177,25 +188,19 @@ class Skeleton(Undead):
     intelligence multiplier: 0.25
     command queue: bash, fight, life_drain
     """
+    __slots__ = ()
     strMult = 1.25
     spdMult = 0.5
     intMult = 0.25
     command_q = ['bash', 'fight', 'life_drain']
     
-    def bash(self, target):
-        """
-        damage: strength * 2
-        """
-        target.take_damage(self.strength * 2)
+    bash = method('bash')
 
 
 class Humanoid(Monster):
+    __slots__ = ()
     
-    def slash(self, target):
-        """
-        damage: strength + speed
-        """
-        target.take_damage(self.strength + self.speed)
+    slash = method('slash')
 
 
 class Troll(Humanoid):
@@ -204,17 +209,14 @@ class Troll(Humanoid):
     constitution multiplier: 1.5
     base hp: 20
     """
+    __slots__ = ()
     strMult = 1.75
     constMult = 1.5
     init_hp = 20
     command_q =  ['slash', 'fight', 'regenerate']
     
     
-    def regenerate(self, *args):
-        """
-        heals self for constitution
-        """
-        self.hp += self.constitution
+    regenerate = method('regenerate')
 
 
 class Orc(Humanoid):
@@ -222,14 +224,9 @@ class Orc(Humanoid):
     strength multiplier: 1.75
     base hp: 16
     """
+    __slots__ = ()
     strMult = 1.75
     init_hp = 16
     command_q =  ['blood_rage', 'slash', 'fight']
     
-    def blood_rage(self, target):
-        """
-        cost: constitution * 0.5 hp
-        damage: strength * 2
-        """
-        target.take_damage(self.strength * 2)
-        self.hp -= (self.constitution * 0.5)
+    blood_rage = method('blood_rage')
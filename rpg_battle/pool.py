@@ -0,0 +1,46 @@
+"""
+Pool of reusable unit instances.
+
+Simulations build the same units for every run. A UnitPool keeps released
+units per (class, level) and hands them out again after reset(), which
+copies the cached starting stats back instead of constructing a new unit.
+"""
+
+
+class UnitPool(object):
+    def __init__(self):
+        self._free = {}
+        self.created = 0
+
+    def acquire(self, cls, level=1):
+        """
+        Returns a pristine cls unit at level, reusing a released one if
+        possible
+        """
+        free = self._free.get((cls, level))
+        if free:
+            return free.pop()
+        self.created += 1
+        return cls(level=level)
+
+    def acquire_all(self, specs):
+        """
+        Returns units for a list of (unit class, level) pairs
+        """
+        return [self.acquire(cls, level) for cls, level in specs]
+
+    def release(self, units):
+        """
+        Resets units and keeps them for later acquire calls. Released
+        units must not be used by the caller anymore.
+        """
+        for unit in units:
+            unit.reset()
+            key = (type(unit), unit.level)
+            self._free.setdefault(key, []).append(unit)
+
+    def __len__(self):
+        return sum(len(free) for free in self._free.values())
+
+    def clear(self):
+        self._free.clear()
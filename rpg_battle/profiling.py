@@ -0,0 +1,172 @@
+"""
+Opt-in battle instrumentation.
+
+instrument(battle) wraps the battle's ability, scheduling, bookkeeping and
+rendering steps with timing versions, as attributes of that battle only.
+uninstrument(battle) removes them again, so a battle that is not profiled
+runs exactly the same code as before. Battle.enable_profiling and
+Battle.disable_profiling are the usual entry points.
+"""
+from timeit import default_timer
+
+from .battle import INSUFFICIENT_MP, INVALID_TARGET
+from .dispatch import NAMES
+from .exceptions import *
+from . import events
+
+PHASES = ('schedule', 'ability', 'bookkeeping', 'render')
+# start and execute_command render once per batch of turns, after the last
+# one ended, so render time only counts in the phase totals
+TURN_PHASES = PHASES[:-1]
+
+# Battle.step statuses recorded as errors
+_ERRORS = {INSUFFICIENT_MP: InsufficientMP, INVALID_TARGET: InvalidTarget}
+_DAMAGE = (events.FIGHT, events.ABILITY)
+_WRAPPED = ('step', 'current_attacker', '_reschedule', '_act',
+            '_casualties', 'render')
+
+
+class AbilityStats(object):
+    __slots__ = ('calls', 'time', 'damage', 'errors')
+
+    def __init__(self):
+        self.calls = 0
+        self.time = 0.0
+        self.damage = 0
+        # exception name -> count
+        self.errors = {}
+
+
+class BattleProfile(object):
+    def __init__(self, keep_turns=False):
+        """
+        Collects ability statistics per (unit class name, ability name)
+        and cumulative seconds per phase. With keep_turns, turns also
+        holds the TURN_PHASES times of every single unit turn.
+        """
+        self.abilities = {}
+        self.phases = dict((phase, 0.0) for phase in PHASES)
+        self.turn_count = 0
+        self.keep_turns = keep_turns
+        self.turns = []
+        self._turn = dict((phase, 0.0) for phase in TURN_PHASES)
+
+    def stats(self, unit_class, ability):
+        key = (unit_class, ability)
+        stats = self.abilities.get(key)
+        if stats is None:
+            stats = self.abilities[key] = AbilityStats()
+        return stats
+
+    def _add(self, phase, elapsed):
+        self.phases[phase] += elapsed
+        if phase in self._turn:
+            self._turn[phase] += elapsed
+
+    def _end_turn(self):
+        self.turn_count += 1
+        if self.keep_turns:
+            self.turns.append(tuple(self._turn[phase]
+                                    for phase in TURN_PHASES))
+        for phase in TURN_PHASES:
+            self._turn[phase] = 0.0
+
+    def report(self):
+        """
+        Returns a text table of the ability statistics, slowest first,
+        followed by the phase totals
+        """
+        lines = ['{:<12} {:<16} {:>8} {:>10} {:>10} {}'.format(
+            'class', 'ability', 'calls', 'time ms', 'damage', 'errors')]
+        rows = sorted(self.abilities.items(), key=lambda item: -item[1].time)
+        for (unit_class, ability), stats in rows:
+            errors = ', '.join('{} {}'.format(name, count) for name, count
+                               in sorted(stats.errors.items()))
+            lines.append('{:<12} {:<16} {:>8} {:>10.3f} {:>10g} {}'.format(
+                unit_class, ability, stats.calls, stats.time * 1000,
+                stats.damage, errors))
+        lines.append('')
+        turns = self.turn_count or 1
+        for phase in PHASES:
+            lines.append('{:<12} {:>10.3f} ms total {:>10.2f} us/turn'.format(
+                phase, self.phases[phase] * 1000,
+                self.phases[phase] * 1e6 / turns))
+        return '\n'.join(lines)
+
+
+def instrument(battle, profile):
+    """
+    Installs the timing wrappers on battle, recording into profile
+    """
+    uninstrument(battle)
+    step = battle.step
+    current_attacker = battle.current_attacker
+    reschedule = battle._reschedule
+    act = battle._act
+    casualties = battle._casualties
+    render = battle.render
+
+    # errors are only counted here, as every command goes through step
+    def timed_step(command=None, target=None):
+        hero = current_attacker() if command is not None else None
+        status = step(command, target)
+        error = _ERRORS.get(status)
+        if error is not None:
+            stats = profile.stats(type(hero).__name__, command)
+            name = error.__name__
+            stats.errors[name] = stats.errors.get(name, 0) + 1
+        return status
+
+    def timed_current_attacker():
+        start = default_timer()
+        unit = current_attacker()
+        profile._add('schedule', default_timer() - start)
+        return unit
+
+    def timed_reschedule(unit):
+        start = default_timer()
+        reschedule(unit)
+        profile._add('schedule', default_timer() - start)
+
+    def timed_act(unit, ability, target):
+        first = len(battle.events)
+        start = default_timer()
+        try:
+            act(unit, ability, target)
+        finally:
+            elapsed = default_timer() - start
+            profile._add('ability', elapsed)
+        event = battle.events[first]
+        stats = profile.stats(type(unit).__name__, NAMES[event.ability])
+        stats.calls += 1
+        stats.time += elapsed
+        if event.kind in _DAMAGE:
+            stats.damage += event.amount
+
+    def timed_casualties(unit, target):
+        start = default_timer()
+        status = casualties(unit, target)
+        profile._add('bookkeeping', default_timer() - start)
+        profile._end_turn()
+        return status
+
+    def timed_render(batch=None):
+        start = default_timer()
+        text = render(batch)
+        profile._add('render', default_timer() - start)
+        return text
+
+    battle.step = timed_step
+    battle.current_attacker = timed_current_attacker
+    battle._reschedule = timed_reschedule
+    battle._act = timed_act
+    battle._casualties = timed_casualties
+    battle.render = timed_render
+
+
+def uninstrument(battle):
+    """
+    Removes the timing wrappers, battle goes back to its class methods
+    """
+    for name in _WRAPPED:
+        battle.__dict__.pop(name, None)
@@ -0,0 +1,213 @@
+"""
+Fixed-width binary unit records.
+
+save() writes heroes and monsters as a header followed by one RECORD
+sized record per unit: class id, level, xp, hp, maxhp, mp, maxmp and the
+four stats. RecordFile opens such a file through mmap, so opening costs
+nothing regardless of its size and single records are read or updated in
+place, without loading the others.
+
+Monsters have no xp, mp nor maxmp and store 0. Their command queue
+restarts from the beginning when loaded, as after Monster.reset().
+"""
+import mmap
+import struct
+from collections import namedtuple
+
+from . import heroes
+from . import monsters
+
+MAGIC = b'RPGU'
+VERSION = 1
+# magic, version, record size, number of records
+HEADER = struct.Struct('<4sHHQ')
+# class id, level, xp, hp, maxhp, mp, maxmp, strength, constitution,
+# intelligence, speed
+RECORD = struct.Struct('<HxxI9d')
+FIELDS = ('class_id', 'level', 'xp', 'hp', 'maxhp', 'mp', 'maxmp',
+          'strength', 'constitution', 'intelligence', 'speed')
+
+Record = namedtuple('Record', FIELDS)
+
+# class ids are indexes in this tuple, only append to it
+CLASSES = (heroes.Hero, heroes.Warrior, heroes.Mage, heroes.Cleric,
+           heroes.Rogue, monsters.Monster, monsters.Dragon,
+           monsters.RedDragon, monsters.GreenDragon, monsters.Undead,
+           monsters.Vampire, monsters.Skeleton, monsters.Humanoid,
+           monsters.Troll, monsters.Orc)
+
+
+def _number(value):
+    """
+    Stats are stored as doubles, whole ones come back as ints
+    """
+    if value.is_integer():
+        return int(value)
+    return value
+
+
+def pack(unit, classes=CLASSES):
+    """
+    Returns the record bytes of unit
+    """
+    try:
+        class_id = classes.index(type(unit))
+    except ValueError:
+        raise ValueError('no class id for {}'.format(type(unit).__name__))
+    hero = isinstance(unit, heroes.Hero)
+    return RECORD.pack(
+        class_id, unit.level, unit.xp if hero else 0, unit.hp, unit.maxhp,
+        unit.mp if hero else 0, unit.maxmp if hero else 0, unit.strength,
+        unit.constitution, unit.intelligence, unit.speed)
+
+
+def unpack(data, offset=0, classes=CLASSES):
+    """
+    Returns the unit stored in the record at offset of data
+    """
+    record = Record(*RECORD.unpack_from(data, offset))
+    cls = classes[record.class_id]
+    unit = cls.__new__(cls)
+    unit.level = record.level
+    for field in ('hp', 'maxhp', 'strength', 'constitution', 'intelligence',
+                  'speed'):
+        setattr(unit, field, _number(getattr(record, field)))
+    if issubclass(cls, heroes.Hero):
+        unit.xp = _number(record.xp)
+        unit.mp = _number(record.mp)
+        unit.maxmp = _number(record.maxmp)
+        unit._start_level = unit.level
+    else:
+        unit.command_index = 0
+    return unit
+
+
+def save(path, units, classes=CLASSES, batch=4096):
+    """
+    Writes units, any iterable, to path in batches of records. Returns the
+    number of units written.
+    """
+    count = 0
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, 0))
+        chunk = []
+        for unit in units:
+            chunk.append(pack(unit, classes))
+            if len(chunk) == batch:
+                f.write(b''.join(chunk))
+                count += len(chunk)
+                chunk = []
+        f.write(b''.join(chunk))
+        count += len(chunk)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, count))
+    return count
+
+
+def load(path, classes=CLASSES):
+    """
+    Returns the list of all units in path
+    """
+    with RecordFile(path, classes=classes) as records:
+        return list(records)
+
+
+class RecordFile(object):
+    def __init__(self, path, writable=False, classes=CLASSES):
+        """
+        Maps the records of path into memory. writable allows updating
+        records in place, the file itself never grows.
+        """
+        self.classes = classes
+        self.writable = writable
+        self._file = open(path, 'r+b' if writable else 'rb')
+        try:
+            header = self._file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError('{} is not a unit record file'.format(path))
+            magic, version, size, count = HEADER.unpack(header)
+            if magic != MAGIC or size != RECORD.size:
+                raise ValueError('{} is not a unit record file'.format(path))
+            if version != VERSION:
+                raise ValueError('unsupported record file version {}'.format(
+                    version))
+            self._count = count
+            access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+            self._map = mmap.mmap(self._file.fileno(), 0, access=access)
+        except Exception:
+            self._file.close()
+            raise
+
+    def __len__(self):
+        return self._count
+
+    def _offset(self, index):
+        if not -self._count <= index < self._count:
+            raise IndexError(index)
+        if index < 0:
+            index += self._count
+        return HEADER.size + index * RECORD.size
+
+    def record(self, index):
+        """
+        Returns the raw Record at index
+        """
+        return Record(*RECORD.unpack_from(self._map, self._offset(index)))
+
+    def __getitem__(self, index):
+        """
+        Returns a new unit built from the record at index
+        """
+        return unpack(self._map, self._offset(index), self.classes)
+
+    def __setitem__(self, index, unit):
+        """
+        Overwrites the record at index with unit
+        """
+        offset = self._offset(index)
+        self._map[offset:offset + RECORD.size] = pack(unit, self.classes)
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield unpack(self._map, HEADER.size + index * RECORD.size,
+                         self.classes)
+
+    def update(self, index, **fields):
+        """
+        Changes fields of the record at index, leaving the others as they
+        are
+        """
+        offset = self._offset(index)
+        record = Record(*RECORD.unpack_from(self._map, offset))
+        RECORD.pack_into(self._map, offset, *record._replace(**fields))
+
+    def columns(self):
+        """
+        Returns the records as a numpy structured array sharing the mapped
+        memory, writable if the file is. The array must be deleted before
+        the file is closed. Requires numpy.
+        """
+        import numpy as np
+        dtype = np.dtype({'names': list(FIELDS),
+                          'formats': ['<u2', '<u4'] + ['<f8'] * 9,
+                          'offsets': [0, 4] + [8 + 8 * i for i in range(9)],
+                          'itemsize': RECORD.size})
+        return np.frombuffer(self._map, dtype=dtype, count=self._count,
+                             offset=HEADER.size)
+
+    def flush(self):
+        if self.writable:
+            self._map.flush()
+
+    def close(self):
+        if self._map is not None:
+            self.flush()
+            self._map.close()
+            self._map = None
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,215 @@
+"""
+Array-backed hero roster. Requires numpy.
+
+Heroes of mixed classes are stored as numpy columns so xp grants and
+level ups run over the whole roster at once, with the same results as
+calling Hero.gain_xp/Hero.level_up on every hero.
+"""
+import numpy as np
+
+from .stats import STAT_TABLE
+
+INT_FIELDS = ('level', 'strength', 'constitution', 'intelligence', 'speed')
+FLOAT_FIELDS = ('xp', 'hp', 'mp', 'maxhp', 'maxmp')
+FIELDS = INT_FIELDS + FLOAT_FIELDS
+MODS = (('strength', 'strengthMod'), ('constitution', 'constMod'),
+        ('intelligence', 'intMod'), ('speed', 'speedMod'))
+
+
+def _half_sum(stat, growth, first, last):
+    """
+    Sum of (stat + growth * j) // 2 for j from first to last, elementwise
+    """
+    count = last - first + 1
+    total = count * stat + growth * (first + last) * count // 2
+    parity = (stat + 1) % 2
+    alternating = (last - parity) // 2 - (first - 1 - parity) // 2
+    odd = np.where(growth % 2 == 0, count * (stat % 2), alternating)
+    return (total - odd) // 2
+
+
+def _xp_for_levels(level, levels):
+    return 10.0 * (levels * level + levels * (levels - 1) // 2)
+
+
+class Roster(object):
+    def __init__(self, heroes=(), capacity=16):
+        """
+        Creates a roster holding copies of heroes
+        """
+        self.classes = []
+        self._size = 0
+        self._allocate(max(capacity, len(heroes)))
+        self.extend(heroes)
+
+    def _allocate(self, capacity):
+        columns = {'class_id': np.zeros(capacity, dtype=np.int16)}
+        for field in INT_FIELDS:
+            columns[field] = np.zeros(capacity, dtype=np.int64)
+        for field in FLOAT_FIELDS:
+            columns[field] = np.zeros(capacity)
+        for name, column in columns.items():
+            old = getattr(self, '_' + name, None)
+            if old is not None:
+                column[:self._size] = old[:self._size]
+            setattr(self, '_' + name, column)
+        self._capacity = capacity
+
+    def __len__(self):
+        return self._size
+
+    def __getattr__(self, name):
+        # columns are exposed as views of the filled part of the arrays
+        if name in FIELDS or name == 'class_id':
+            return self.__dict__['_' + name][:self._size]
+        raise AttributeError(name)
+
+    def class_index(self, cls):
+        """
+        Returns the class id of cls, registering it if necessary
+        """
+        if cls not in self.classes:
+            self.classes.append(cls)
+        return self.classes.index(cls)
+
+    def append(self, hero):
+        """
+        Adds a copy of hero, returns its index
+        """
+        if self._size == self._capacity:
+            self._allocate(self._capacity * 2)
+        index = self._size
+        self._class_id[index] = self.class_index(type(hero))
+        for field in FIELDS:
+            getattr(self, '_' + field)[index] = getattr(hero, field)
+        self._size += 1
+        return index
+
+    def extend(self, heroes):
+        for hero in heroes:
+            self.append(hero)
+
+    def __getitem__(self, index):
+        """
+        Returns a view of one hero that behaves like a Hero of its class
+        while reading and writing the roster columns
+        """
+        if not -self._size <= index < self._size:
+            raise IndexError(index)
+        if index < 0:
+            index += self._size
+        cls = self.classes[self._class_id[index]]
+        return _view_class(cls)(self, index)
+
+    def to_hero(self, index):
+        """
+        Returns a standalone Hero copied from the roster
+        """
+        cls = self.classes[self._class_id[index]]
+        hero = cls.__new__(cls)
+        for field in FIELDS:
+            setattr(hero, field, getattr(self, field)[index].item())
+        hero._start_level = hero.level
+        return hero
+
+    def _growth(self):
+        """
+        Per-hero stat growth per level: 1 plus any positive modifier
+        """
+        growth = {}
+        for stat, mod in MODS:
+            table = np.array([1 + max(getattr(cls, mod), 0)
+                              for cls in self.classes], dtype=np.int64)
+            growth[stat] = table[self.class_id]
+        return growth
+
+    def level_up(self, levels=1, index=slice(None)):
+        """
+        Hero.level_up(levels) for the heroes selected by index (all by
+        default). levels may be a scalar or one value per selected hero.
+        """
+        levels = np.broadcast_to(np.asarray(levels, dtype=np.int64),
+                                 self.level[index].shape)
+        growth = dict((stat, column[index])
+                      for stat, column in self._growth().items())
+        gaining = levels > 0
+        level = self.level[index]
+        constitution = self.constitution[index]
+        intelligence = self.intelligence[index]
+
+        self.xp[index] -= np.where(gaining, _xp_for_levels(level, levels), 0)
+        self.maxhp[index] = self._grow(self.maxhp[index], constitution,
+                                       growth['constitution'], levels)
+        self.maxmp[index] = self._grow(self.maxmp[index], intelligence,
+                                       growth['intelligence'], levels)
+        for stat, _ in MODS:
+            getattr(self, stat)[index] += levels * growth[stat]
+        self.level[index] += levels
+        self.hp[index] = np.where(gaining, self.maxhp[index], self.hp[index])
+        self.mp[index] = np.where(gaining, self.maxmp[index], self.mp[index])
+
+    @staticmethod
+    def _grow(total, stat, growth, levels):
+        first = np.trunc(total + 0.5 * (stat + growth))
+        grown = first + _half_sum(stat, growth, 2, levels)
+        return np.where(levels > 0, grown, total)
+
+    def levels_for_xp(self, index=slice(None)):
+        """
+        Number of levels the current xp buys, per selected hero
+        """
+        level = self.level[index]
+        xp = self.xp[index]
+        b = 2 * level - 1
+        levels = np.floor((np.sqrt(b * b + 0.8 * np.maximum(xp, 0)) - b) / 2)
+        levels = np.maximum(levels.astype(np.int64), 0)
+        # correct float rounding of the square root
+        levels -= _xp_for_levels(level, levels) > xp
+        levels += _xp_for_levels(level, levels + 1) <= xp
+        return levels
+
+    def gain_xp(self, xp, index=slice(None)):
+        """
+        Hero.gain_xp(xp) for the heroes selected by index (all by default).
+        xp may be a scalar or one value per selected hero.
+        """
+        self.xp[index] += xp
+        self.level_up(self.levels_for_xp(index), index)
+
+
+_views = {}
+
+
+def _field(name):
+    def get(self):
+        return getattr(self._roster, name)[self._index].item()
+
+    def set(self, value):
+        getattr(self._roster, name)[self._index] = value
+    return property(get, set)
+
+
+def _view_class(cls):
+    """
+    Returns a subclass of cls whose stats live in a roster
+    """
+    view = _views.get(cls)
+    if view is None:
+        namespace = dict((field, _field(field)) for field in FIELDS)
+        namespace['__slots__'] = ('_roster', '_index')
+        namespace['__init__'] = _view_init
+        namespace['base_stats'] = classmethod(_view_base_stats)
+        view = _views[cls] = type(cls.__name__, (cls,), namespace)
+    return view
+
+
+def _view_init(self, roster, index):
+    self._roster = roster
+    self._index = index
+    # like to_hero, reset() goes back to the level the view was taken at
+    self._start_level = roster.level[index].item()
+
+
+def _view_base_stats(view, level):
+    # views cannot be built standalone, reset() copies the viewed class's row
+    return STAT_TABLE.row(view.__bases__[0], level)
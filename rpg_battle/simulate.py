@@ -0,0 +1,171 @@
+import multiprocessing
+import random
+from collections import Counter
+
+from .battle import DEFEAT, EXCEPTIONS, ONGOING, VICTORY, Battle
+from .exceptions import *
+from .pool import UnitPool
+from . import events
+
+_ACTIONS = (events.FIGHT, events.ABILITY, events.HEAL, events.USE)
+_DAMAGE = (events.FIGHT, events.ABILITY)
+
+
+def fight_first(battle, hero):
+    """
+    Default hero policy: fight the first living monster
+    """
+    for monster in battle.monsters:
+        if not monster.is_dead():
+            return 'fight', monster
+
+
+class SimulationResult(object):
+    """
+    Aggregate outcome of many battles between the same party and lineup.
+    turns maps battle length (in unit turns) to the number of battles that
+    took that long, damage holds total damage dealt per unit, in party
+    then lineup order.
+    """
+    def __init__(self, units):
+        self.runs = 0
+        self.wins = 0
+        self.losses = 0
+        self.draws = 0
+        self.turns = Counter()
+        self.damage = [0] * units
+
+    @property
+    def win_rate(self):
+        if not self.runs:
+            return 0.0
+        return float(self.wins) / self.runs
+
+    def mean_turns(self):
+        if not self.runs:
+            return 0.0
+        total = sum(turns * count for turns, count in self.turns.items())
+        return float(total) / self.runs
+
+    def merge(self, other):
+        """
+        Adds the totals of another result into this one
+        """
+        self.runs += other.runs
+        self.wins += other.wins
+        self.losses += other.losses
+        self.draws += other.draws
+        self.turns.update(other.turns)
+        self.damage = [a + b for a, b in zip(self.damage, other.damage)]
+        return self
+
+
+def _build(specs):
+    return [cls(level=level) for cls, level in specs]
+
+
+def _tally(batch, damage):
+    """
+    Adds the damage dealt in batch to damage, returns the number of turns
+    """
+    turns = 0
+    for event in batch:
+        if event.kind in _ACTIONS:
+            turns += 1
+            if event.kind in _DAMAGE:
+                damage[event.actor] += event.amount
+    return turns
+
+
+def run_battle(party, lineup, policy=fight_first, max_turns=10000,
+               seed=None, pool=None):
+    """
+    Plays a single headless battle to the end, or until max_turns unit
+    turns have passed, which counts as a draw.
+    party and lineup are lists of (unit class, level) pairs. Units come
+    from pool (a UnitPool) if given and are released back to it after the
+    battle. Returns a SimulationResult holding just this battle.
+    """
+    if pool is None:
+        units = _build(party) + _build(lineup)
+    else:
+        units = pool.acquire_all(party + lineup)
+    try:
+        return _play(Battle(units, headless=True, seed=seed), policy,
+                     max_turns)
+    finally:
+        if pool is not None:
+            pool.release(units)
+
+
+def _play(battle, policy, max_turns):
+    result = SimulationResult(len(battle.participants))
+    result.runs = 1
+    turns = 0
+    status = battle.step()
+    while True:
+        turns += _tally(battle.events, result.damage)
+        if status == VICTORY:
+            result.wins = 1
+            break
+        if status == DEFEAT:
+            result.losses = 1
+            break
+        if status != ONGOING:
+            raise EXCEPTIONS[status]()
+        if turns >= max_turns:
+            result.draws = 1
+            break
+        command, target = policy(battle, battle.current_attacker())
+        status = battle.step(command, target)
+    result.turns[turns] += 1
+    return result
+
+
+def _run_chunk(args):
+    party, lineup, policy, runs, max_turns, seed = args
+    # battle seeds come from the chunk's own stream, so results do not
+    # depend on which worker runs the chunk
+    seeds = random.Random(seed)
+    pool = UnitPool()
+    result = SimulationResult(len(party) + len(lineup))
+    for _ in range(runs):
+        result.merge(run_battle(party, lineup, policy, max_turns,
+                                seeds.getrandbits(64), pool))
+    return result
+
+
+def simulate(party, lineup, runs, policy=fight_first, processes=None,
+             max_turns=10000, chunksize=1000, seed=None):
+    """
+    Runs independent battles between party and lineup spread across a
+    process pool and returns the aggregated SimulationResult.
+
+    party and lineup are lists of (unit class, level) pairs, policy is a
+    module level function (battle, hero) -> (command, target) choosing the
+    hero commands. processes=1 runs everything in the calling process.
+    The same seed always plays the same battles.
+    """
+    seeds = random.Random(seed)
+    chunks = []
+    remaining = runs
+    while remaining > 0:
+        size = min(chunksize, remaining)
+        chunks.append((party, lineup, policy, size, max_turns,
+                       seeds.getrandbits(64)))
+        remaining -= size
+
+    total = SimulationResult(len(party) + len(lineup))
+    if processes == 1:
+        for chunk in chunks:
+            total.merge(_run_chunk(chunk))
+        return total
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        for result in pool.imap(_run_chunk, chunks):
+            total.merge(result)
+    finally:
+        pool.close()
+        pool.join()
+    return total
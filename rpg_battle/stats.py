@@ -0,0 +1,61 @@
+"""
+Per-class, per-level stat table cache.
+
+Units of the same class and level always start with the same stats, so
+constructors copy a cached row instead of redoing the stat math and level
+ups. Rows are computed by the class's base_stats(level) classmethod.
+"""
+from collections import OrderedDict
+
+if hasattr(OrderedDict, 'move_to_end'):
+    _move_to_end = OrderedDict.move_to_end
+else:
+    def _move_to_end(rows, key):
+        rows[key] = rows.pop(key)
+
+
+class StatTable(object):
+    def __init__(self, maxsize=4096):
+        """
+        Keeps at most maxsize (class, level) rows, dropping the least
+        recently used one when full. maxsize=None never drops rows.
+        """
+        self.maxsize = maxsize
+        self.misses = 0
+        self._rows = OrderedDict()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def row(self, cls, level):
+        """
+        Returns the starting stats of a cls unit at level, as the tuple
+        returned by base_stats
+        """
+        key = (cls, level)
+        rows = self._rows
+        row = rows.get(key)
+        if row is not None:
+            _move_to_end(rows, key)
+            return row
+        row = cls.base_stats(level)
+        self.misses += 1
+        if self.maxsize is not None and len(rows) >= self.maxsize:
+            rows.popitem(last=False)
+        rows[key] = row
+        return row
+
+    def precompute(self, classes, levels):
+        """
+        Fills the table for every class and level given
+        """
+        for cls in classes:
+            for level in levels:
+                self.row(cls, level)
+
+    def clear(self):
+        self._rows.clear()
+        self.misses = 0
+
+
+STAT_TABLE = StatTable()
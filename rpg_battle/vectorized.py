@@ -0,0 +1,231 @@
+"""
+Struct-of-arrays battle engine running many identical-shape battles in
+lockstep. Requires numpy.
+
+Every stat is a (battles, units) column and each step plays one unit turn
+in every unfinished battle. Heroes fight the first living monster (the
+simulate.fight_first policy), monsters use their command queue on a random
+living hero, so results match simulate.run_battle for the same lineup.
+
+With fixed=True the stat columns are int32 fixed-point values (see the
+fixed module) and every step uses integer arithmetic only, giving the
+same results as the float columns.
+"""
+import numpy as np
+
+from .abilities import REGISTRY
+from .fixed import SCALE, to_fixed, trunc
+from .heroes import Hero
+from .modifiers import apply_columns
+from .simulate import SimulationResult, _build
+
+STATS = ('hp', 'maxhp', 'mp', 'maxmp', 'strength', 'constitution',
+         'intelligence', 'speed', 'level', 'xp')
+
+
+def _stat(unit, stat):
+    """
+    Reads a stat, 0 for stats the unit does not have (monsters have no mp
+    and xp is a method on them)
+    """
+    value = getattr(unit, stat, 0)
+    if callable(value):
+        return 0.0
+    return float(value)
+
+
+# compiled forms of the registered abilities, see abilities.Ability.vectorized
+ABILITIES = dict((name, ability.vectorized)
+                 for name, ability in REGISTRY.items())
+
+
+class BatchBattle(object):
+    def __init__(self, party, lineup, battles, seed=None, fixed=False):
+        """
+        Sets up the columns for battles copies of party against lineup,
+        both lists of (unit class, level) pairs. fixed stores the stats as
+        int32 fixed-point values scaled by self.scale.
+        """
+        units = _build(party) + _build(lineup)
+        self.battles = battles
+        self.size = len(units)
+        self.scale = SCALE if fixed else 1
+        for stat in STATS:
+            if fixed:
+                row = np.array([to_fixed(_stat(unit, stat)) for unit in units],
+                               dtype=np.int32)
+            else:
+                row = np.array([_stat(unit, stat) for unit in units])
+            setattr(self, stat, np.tile(row, (battles, 1)))
+
+        self.classes = []
+        for unit in units:
+            if type(unit) not in self.classes:
+                self.classes.append(type(unit))
+        self.class_id = np.array([self.classes.index(type(unit))
+                                  for unit in units])
+        self.is_hero = np.array([isinstance(unit, Hero) for unit in units])
+        self.heroes = np.flatnonzero(self.is_hero)
+        self.monsters = np.flatnonzero(~self.is_hero)
+        # level up growth: +1 plus any positive class modifier
+        self.growth = dict(
+            (stat, np.array([1 + max(getattr(unit, mod, 0), 0) for unit in units])
+             * self.scale)
+            for stat, mod in (('strength', 'strengthMod'),
+                              ('constitution', 'constMod'),
+                              ('intelligence', 'intMod'),
+                              ('speed', 'speedMod')))
+        self.commands = [tuple(unit.abilities[:1]) if isinstance(unit, Hero)
+                         else tuple(unit.command_q) for unit in units]
+
+        shape = (battles, self.size)
+        self.alive = self.hp > 0
+        self.cursor = np.zeros(shape, dtype=int)
+        self.round = np.zeros(shape, dtype=int)
+        self.push_speed = self.speed.copy()
+        self.order = np.tile(np.arange(self.size), (battles, 1))
+        self.turns = np.zeros(battles, dtype=int)
+        self.damage = np.zeros(shape, dtype=np.int64 if fixed else float)
+        self.won = np.zeros(battles, dtype=bool)
+        self.lost = np.zeros(battles, dtype=bool)
+        self.done = np.zeros(battles, dtype=bool)
+        self.rng = np.random.RandomState(seed)
+        self._check_outcome(np.arange(battles))
+
+    def take_damage(self, b, t, damage):
+        """
+        take_damage of the targets in columns t, through the damage
+        modifiers of their classes
+        """
+        self._modify('damage', b, t, damage)
+
+    def heal_damage(self, b, t, healing):
+        """
+        heal_damage of the targets in columns t, through the healing
+        modifiers of their classes
+        """
+        self._modify('healing', b, t, healing)
+
+    def _modify(self, kind, b, t, amount):
+        self.hp[b, t] = apply_columns(kind, self.classes, self.class_id[t],
+                                      self.hp[b, t], self.maxhp[b, t], amount,
+                                      self.scale)
+
+    def current_attackers(self, b):
+        """
+        returns the acting unit column for each battle in b
+        """
+        keys = (self.order[b], -self.push_speed[b], self.round[b],
+                ~self.alive[b])
+        return np.lexsort(keys, axis=-1)[:, 0]
+
+    def _targets(self, b, hero):
+        if hero:
+            # first living monster
+            living = self.alive[b][:, self.monsters]
+            return self.monsters[np.argmax(living, axis=1)]
+        # random living hero
+        living = self.alive[b][:, self.heroes]
+        pick = np.floor(self.rng.random_sample(len(b)) * living.sum(axis=1))
+        seen = np.cumsum(living, axis=1)
+        return self.heroes[np.argmax(seen > pick[:, None], axis=1)]
+
+    def step(self):
+        """
+        plays one unit turn in every unfinished battle, returns False once
+        all battles are over
+        """
+        active = np.flatnonzero(~self.done)
+        if not active.size:
+            return False
+        actors = self.current_attackers(active)
+        for u in np.unique(actors):
+            b = active[actors == u]
+            t = self._targets(b, self.is_hero[u])
+            before = self.hp[b, t]
+            commands = self.commands[u]
+            slot = self.cursor[b, u] % len(commands)
+            for index, command in enumerate(commands):
+                chosen = slot == index
+                if chosen.any():
+                    ABILITIES[command](self, b[chosen], u, t[chosen])
+            self.cursor[b, u] += 1
+            self.damage[b, u] += np.maximum(before - self.hp[b, t], 0)
+            self.round[b, u] += 1
+            self.push_speed[b, u] = self.speed[b, u]
+            self._casualties(b, t)
+            self._casualties(b, np.full(len(b), u))
+        self.turns[active] += 1
+        self._check_outcome(active)
+        return True
+
+    def _casualties(self, b, t):
+        died = self.alive[b, t] & (self.hp[b, t] <= 0)
+        if not died.any():
+            return
+        b, t = b[died], t[died]
+        self.alive[b, t] = False
+        monster = ~self.is_hero[t]
+        if monster.any():
+            b, t = b[monster], t[monster]
+            total = (self.strength[b, t] + self.constitution[b, t] +
+                     self.intelligence[b, t] + self.speed[b, t])
+            if self.scale == 1:
+                total = total / 4
+            else:
+                total = total // 4
+            self._gain_xp(b, total + self.maxhp[b, t] % (10 * self.scale))
+
+    def _gain_xp(self, b, xp):
+        gain = np.zeros(self.battles, dtype=self.xp.dtype)
+        np.add.at(gain, b, xp)
+        living = self.alive & self.is_hero
+        self.xp += gain[:, None] * living
+        while True:
+            ready = living & (self.xp >= 10 * self.level)
+            if not ready.any():
+                return
+            self._level_up(ready)
+
+    def _level_up(self, mask):
+        """
+        Hero.level_up for every unit in mask
+        """
+        self.xp -= np.where(mask, 10 * self.level, 0)
+        self.level += mask * self.scale
+        for stat, growth in self.growth.items():
+            getattr(self, stat)[...] += mask * growth
+        if self.scale == 1:
+            maxhp = np.trunc(self.maxhp + 0.5 * self.constitution)
+            maxmp = np.trunc(self.maxmp + 0.5 * self.intelligence)
+        else:
+            maxhp = trunc(self.maxhp + self.constitution // 2)
+            maxmp = trunc(self.maxmp + self.intelligence // 2)
+        self.maxhp[...] = np.where(mask, maxhp, self.maxhp)
+        self.maxmp[...] = np.where(mask, maxmp, self.maxmp)
+        self.hp[...] = np.where(mask, self.maxhp, self.hp)
+        self.mp[...] = np.where(mask, self.maxmp, self.mp)
+
+    def _check_outcome(self, b):
+        won = ~self.alive[b][:, self.monsters].any(axis=1)
+        lost = ~won & ~self.alive[b][:, self.heroes].any(axis=1)
+        self.won[b] |= won
+        self.lost[b] |= lost
+        self.done[b] |= won | lost
+
+    def run(self, max_turns=10000):
+        """
+        Plays every battle to the end, battles still going after max_turns
+        unit turns count as draws. Returns a SimulationResult.
+        """
+        while self.step():
+            self.done |= self.turns >= max_turns
+        result = SimulationResult(self.size)
+        result.runs = self.battles
+        result.wins = int(self.won.sum())
+        result.losses = int(self.lost.sum())
+        result.draws = self.battles - result.wins - result.losses
+        for turns, count in zip(*np.unique(self.turns, return_counts=True)):
+            result.turns[int(turns)] = int(count)
+        result.damage = (self.damage.sum(axis=0) / self.scale).tolist()
+        return result
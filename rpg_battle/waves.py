@@ -0,0 +1,56 @@
+"""
+Lazy monster waves for survival battles.
+
+waves() yields one list of freshly built monsters per wave, drawing their
+classes from a weighted mix with its own random stream, so a wave only
+exists once it is needed. A Battle given waves pulls the next one whenever
+the monster side is wiped out.
+"""
+import bisect
+import random
+
+from .monsters import GreenDragon, Orc, RedDragon, Skeleton, Troll, Vampire
+
+DEFAULT_MIX = ((RedDragon, 1), (GreenDragon, 1), (Vampire, 2),
+               (Skeleton, 3), (Troll, 2), (Orc, 3))
+
+
+def waves(mix=DEFAULT_MIX, size=3, level=1, level_step=1, every=1,
+          seed=None, count=None):
+    """
+    Yields waves of monsters forever, or count waves.
+
+    mix is a sequence (or dict) of (monster class, weight) pairs. size is
+    the number of monsters per wave, or (low, high) for a random size
+    between both bounds. Wave n, counting from 0, is level
+    level + (n // every) * level_step. The same seed yields the same waves.
+    Raises ValueError if a wave could be empty.
+    """
+    low = size[0] if isinstance(size, tuple) else size
+    if low < 1:
+        raise ValueError('waves need at least 1 monster, got size {!r}'.format(
+            size))
+    return _waves(mix, size, level, level_step, every, seed, count)
+
+
+def _waves(mix, size, level, level_step, every, seed, count):
+    if isinstance(mix, dict):
+        mix = sorted(mix.items(), key=lambda item: item[0].__name__)
+    classes = []
+    totals = []
+    total = 0
+    for cls, weight in mix:
+        total += weight
+        classes.append(cls)
+        totals.append(total)
+    rng = random.Random(seed)
+    wave = 0
+    while count is None or wave < count:
+        wave_level = level + (wave // every) * level_step
+        if isinstance(size, tuple):
+            wave_size = rng.randint(*size)
+        else:
+            wave_size = size
+        yield [classes[bisect.bisect_right(totals, rng.random() * total)](
+            level=wave_level) for _ in range(wave_size)]
+        wave += 1
@@ -37,6 +37,9 @@ setup(
         'pytest-cov==2.4.0',
         'coverage==4.2'
     ],
+    extras_require={
+        'numpy': ['numpy'],
+    },
     zip_safe=False,
     cmdclass={'test': PyTest},
 )
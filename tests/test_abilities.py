@@ -0,0 +1,107 @@
+import unittest
+
+from rpg_battle import abilities
+from rpg_battle import heroes
+from rpg_battle import monsters
+from rpg_battle.exceptions import *
+
+try:
+    import numpy
+    from rpg_battle import vectorized
+except ImportError:
+    numpy = None
+
+
+class AbilityRegistryTestCase(unittest.TestCase):
+    def test_classes_use_compiled_methods(self):
+        # through __dict__, class access gives unbound methods on Python 2
+        self.assertIs(heroes.Mage.__dict__['fireball'],
+                      abilities.method('fireball'))
+        self.assertIs(monsters.Vampire.__dict__['bite'],
+                      abilities.method('bite'))
+        self.assertIs(heroes.Hero.__dict__['fight'],
+                      monsters.Monster.__dict__['fight'])
+
+    def test_describe(self):
+        self.assertEqual(abilities.REGISTRY['fireball'].describe(),
+                         'cost: 8 mp\ndamage: int(6 + 0.5 * intelligence)')
+        self.assertIn('cost: 8 mp', heroes.Mage.fireball.__doc__)
+
+    def test_preview(self):
+        mage = heroes.Mage()
+        self.assertEqual(abilities.REGISTRY['fireball'].preview(mage),
+                         [('damage', 10)])
+        self.assertEqual(mage.mp, 54)
+        vampire = monsters.Vampire()
+        self.assertEqual(abilities.REGISTRY['bite'].preview(vampire),
+                         [('damage', 4.0), ('lower_maxhp', 4.0),
+                          ('restore', 4.0)])
+
+    def test_register(self):
+        ability = abilities.Ability('drain_strike',
+                                    [('damage', 'strength + level'),
+                                     ('restore', 'level')],
+                                    mp_cost=2,
+                                    precondition='target.hp > 0')
+        hero = heroes.Warrior()
+        hero.hp -= 5
+        target = monsters.Troll()
+        ability.method(hero, target)
+        self.assertEqual(target.hp, target.maxhp - 8)
+        self.assertEqual(hero.hp, hero.maxhp - 4)
+        self.assertEqual(hero.mp, hero.maxmp - 2)
+        target.hp = 0
+        with self.assertRaises(InvalidTarget):
+            ability.method(hero, target)
+        hero.mp = 1
+        target.hp = 5
+        with self.assertRaises(InsufficientMP):
+            ability.method(hero, target)
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class VectorizedAbilityTestCase(unittest.TestCase):
+    def apply(self, hero, monster, name, user, battles=2):
+        """
+        Applies name in a BatchBattle and on unit objects, returns both
+        """
+        engine = vectorized.BatchBattle([(hero, 3)], [(monster, 2)], battles)
+        units = [hero(3), monster(2)]
+        b = numpy.arange(battles)
+        target = numpy.full(battles, 1 - user)
+        ok = abilities.REGISTRY[name].vectorized(engine, b, user, target)
+        getattr(units[user], name)(units[1 - user])
+        return engine, units, ok
+
+    def assertMatches(self, engine, units):
+        for column, unit in enumerate(units):
+            for stat in ('hp', 'maxhp', 'mp'):
+                if hasattr(unit, stat):
+                    self.assertEqual(engine.__dict__[stat][:, column].tolist(),
+                                     [getattr(unit, stat)] * engine.battles)
+
+    def test_matches_methods(self):
+        cases = [(heroes.Cleric, monsters.Vampire, 'heal', 0),
+                 (heroes.Cleric, monsters.Troll, 'smite', 0),
+                 (heroes.Mage, monsters.RedDragon, 'fireball', 0),
+                 (heroes.Warrior, monsters.Orc, 'reckless_charge', 0),
+                 (heroes.Warrior, monsters.Vampire, 'bite', 1),
+                 (heroes.Rogue, monsters.Orc, 'blood_rage', 1),
+                 (heroes.Rogue, monsters.Troll, 'regenerate', 1)]
+        for hero, monster, name, user in cases:
+            engine, units, ok = self.apply(hero, monster, name, user)
+            self.assertTrue(ok.all())
+            self.assertMatches(engine, units)
+
+    def test_failed_requirements(self):
+        engine = vectorized.BatchBattle([(heroes.Rogue, 1)],
+                                        [(monsters.Troll, 1)], 3)
+        engine.hp[1, 1] -= 1
+        engine.mp[2, 0] = 0
+        b = numpy.arange(3)
+        target = numpy.ones(3, dtype=int)
+        ok = abilities.REGISTRY['backstab'].vectorized(engine, b, 0, target)
+        self.assertEqual(ok.tolist(), [True, False, True])
+        ok = abilities.REGISTRY['rapid_strike'].vectorized(engine, b, 0, target)
+        self.assertEqual(ok.tolist(), [True, True, False])
+        self.assertEqual(engine.mp[:, 0].tolist(), [47, 47, 0])
@@ -0,0 +1,73 @@
+import unittest
+from timeit import default_timer
+
+from rpg_battle import heroes
+from rpg_battle import monsters
+from rpg_battle.autopilot import AutoPilot
+from rpg_battle.battle import Battle
+from rpg_battle.exceptions import *
+
+
+class AutoPilotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.participants = [heroes.Warrior(level=3), heroes.Cleric(level=3),
+                             monsters.Orc(level=3), monsters.Vampire(level=3)]
+        self.battle = Battle(self.participants, seed=7)
+        self.battle.start()
+
+    def test_decision_is_valid(self):
+        pilot = AutoPilot(iterations=50, seed=1)
+        hero = self.battle.current_attacker()
+        command, target = pilot.decide(self.battle)
+        self.assertIn(command, hero.abilities)
+        self.assertIn(target, self.participants)
+        self.assertFalse(target.is_dead())
+
+    def test_search_leaves_battle_untouched(self):
+        before = self.battle.snapshot()
+        events = list(self.battle.events)
+        self.assertTrue(events)
+        AutoPilot(iterations=50, seed=1).decide(self.battle)
+        self.assertEqual(self.battle.snapshot(), before)
+        self.assertEqual(self.battle.commands, [])
+        self.assertEqual(self.battle.events, events)
+
+    def test_time_budget(self):
+        pilot = AutoPilot(budget=10, seed=1)
+        start = default_timer()
+        pilot.decide(self.battle)
+        self.assertLess(default_timer() - start, 0.1)
+
+    def test_tree_reuse(self):
+        pilot = AutoPilot(iterations=200, seed=1)
+        command, target = pilot.decide(self.battle)
+        subtree = pilot.root.children[(command,
+                                       self.participants.index(target))]
+        self.battle.execute_command(command, target)
+        pilot.decide(self.battle)
+        self.assertIs(pilot.root, subtree)
+
+    def test_wins_battle(self):
+        pilot = AutoPilot(iterations=100, seed=1)
+        with self.assertRaises(Victory):
+            for _ in range(100):
+                self.battle.execute_command(*pilot.decide(self.battle))
+
+    def test_playouts_sample_monsters(self):
+        class Recorder(AutoPilot):
+            def _playout(self, battle):
+                super(Recorder, self)._playout(battle)
+                outcomes.append(tuple(hero.hp for hero in battle.heroes))
+
+        # plain heroes only fight the orc, so outcomes only differ by the
+        # hero the orc picks
+        searches = []
+        for seed in (1, 2):
+            battle = Battle([heroes.Hero(level=3), heroes.Hero(level=3),
+                             monsters.Orc(level=5)], seed=7)
+            battle.start()
+            outcomes = []
+            Recorder(iterations=20, depth=4, seed=seed).decide(battle)
+            searches.append(outcomes)
+        self.assertTrue(len(set(searches[0])) > 1)
+        self.assertNotEqual(searches[0], searches[1])
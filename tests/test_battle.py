@@ -2,7 +2,10 @@ import unittest
 
 from rpg_battle import heroes
 from rpg_battle import monsters
+from rpg_battle import battle as battle_module
+from rpg_battle import events
 from rpg_battle.battle import Battle
+from rpg_battle.dispatch import ability_id
 from rpg_battle.exceptions import *
 
 class BattleTestCase(unittest.TestCase):
@@ -100,3 +103,266 @@ class BattleTestCase(unittest.TestCase):
             battle.execute_command('smite', troll)
         after_level = cleric.level
         self.assertNotEqual(before_level, after_level)
+
+    def test_dead_units_leave_initiative_queue(self):
+        rogue = heroes.Rogue()
+        troll = monsters.Troll()
+        skeleton = monsters.Skeleton()
+        warr = heroes.Warrior()
+        participants = [rogue, troll, skeleton, warr]
+
+        battle = Battle(participants)
+
+        # initiative order: Rogue, Troll, Warrior, Skeleton
+        battle.start()
+        self.assertIs(battle.current_attacker(), rogue)
+        output = battle.execute_command('backstab', skeleton)
+        self.assertIn('Skeleton dies!', output)
+        self.assertIs(battle.current_attacker(), warr)
+        battle.execute_command('fight', troll)
+        self.assertIs(battle.current_attacker(), rogue)
+
+    def test_headless_events(self):
+        warr = heroes.Warrior()
+        orc = monsters.Orc()
+        participants = [warr, orc]
+
+        battle = Battle(participants, headless=True)
+
+        output = battle.start()
+        kinds = [event.kind for event in output]
+        self.assertEqual(kinds, [events.ABILITY, events.SELF_DAMAGE,
+                                 events.TURN])
+        self.assertEqual(output[0], events.Event(events.ABILITY, 1,
+                                                 ability_id('blood_rage'),
+                                                 0, 28))
+        self.assertEqual(battle.render(output).splitlines(),
+                         ['Orc hits Warrior with blood rage for 28 damage!',
+                          'Orc takes 4 self-inflicted damage!',
+                          "Warrior's turn!"])
+
+    def test_seeded_battles_repeat(self):
+        outputs = []
+        for _ in range(2):
+            participants = [heroes.Warrior(), heroes.Mage(), heroes.Rogue(),
+                            monsters.Orc(), monsters.GreenDragon()]
+            battle = Battle(participants, seed=1234)
+            outputs.append(battle.start())
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_replay(self):
+        warr = heroes.Warrior()
+        mage = heroes.Mage()
+        orc = monsters.Orc()
+        dragon = monsters.GreenDragon()
+        battle = Battle([warr, mage, orc, dragon])
+        battle.start()
+        battle.execute_command('fireball', orc)
+        battle.execute_command('shield_slam', orc)
+
+        replayed = Battle.replay([heroes.Warrior(), heroes.Mage(),
+                                  monsters.Orc(), monsters.GreenDragon()],
+                                 battle.seed, battle.commands)
+        self.assertEqual(replayed.commands, [('fireball', 2),
+                                             ('shield_slam', 2)])
+        for unit, copy in zip(battle.participants, replayed.participants):
+            self.assertEqual(unit.hp, copy.hp)
+            self.assertEqual(unit.level, copy.level)
+        self.assertIs(replayed.current_attacker(), replayed.participants[1])
+
+    def test_snapshot_restore(self):
+        warr = heroes.Warrior()
+        mage = heroes.Mage()
+        orc = monsters.Orc()
+        dragon = monsters.GreenDragon()
+        battle = Battle([warr, mage, orc, dragon], headless=True)
+        battle.start()
+        snapshot = battle.snapshot()
+
+        first = battle.execute_command('fireball', orc)
+        stats = [(unit.hp, unit.maxhp, unit.level)
+                 for unit in battle.participants]
+        battle.execute_command('shield_slam', orc)
+        self.assertTrue(orc.is_dead())
+
+        battle.restore(snapshot)
+        self.assertFalse(orc.is_dead())
+        self.assertIs(battle.current_attacker(), mage)
+        self.assertEqual(battle.commands, [])
+        self.assertEqual(battle.execute_command('fireball', orc), first)
+        self.assertEqual([(unit.hp, unit.maxhp, unit.level)
+                          for unit in battle.participants], stats)
+
+    def test_alive_indexes(self):
+        rogue = heroes.Rogue()
+        troll = monsters.Troll()
+        skeleton = monsters.Skeleton()
+        warr = heroes.Warrior()
+        battle = Battle([rogue, troll, skeleton, warr])
+        self.assertEqual(sorted(battle.alive_heroes), [0, 3])
+        self.assertEqual(sorted(battle.alive_monsters), [1, 2])
+
+        battle.start()
+        battle.execute_command('backstab', skeleton)
+        self.assertEqual(battle.alive_monsters, [1])
+        self.assertEqual(sorted(battle.alive_heroes), [0, 3])
+
+    def test_invalid_command(self):
+        rogue = heroes.Rogue(level=99)
+        skeleton = monsters.Skeleton()
+        battle = Battle([rogue, skeleton])
+        battle.start()
+        with self.assertRaises(InvalidCommand):
+            battle.execute_command('fireball', skeleton)
+
+
+class StepTestCase(unittest.TestCase):
+    def test_statuses(self):
+        rogue = heroes.Rogue(level=5)
+        troll = monsters.Troll()
+        orc = monsters.Orc()
+        battle = Battle([rogue, troll, orc], headless=True, seed=1)
+        self.assertEqual(battle.step(), battle_module.ONGOING)
+        self.assertEqual(battle.step('fireball', troll),
+                         battle_module.INVALID_COMMAND)
+        rogue.mp = 2
+        self.assertEqual(battle.step('rapid_strike', troll),
+                         battle_module.INSUFFICIENT_MP)
+        self.assertEqual(battle.events, [])
+        self.assertEqual(battle.commands, [])
+        troll.hp -= 1
+        self.assertEqual(battle.step('backstab', troll),
+                         battle_module.INVALID_TARGET)
+        self.assertEqual(battle.step('backstab', orc), battle_module.ONGOING)
+        self.assertTrue(battle.events)
+        status = battle_module.ONGOING
+        while status == battle_module.ONGOING:
+            target = battle.participants[min(battle.alive_monsters)]
+            status = battle.step('fight', target)
+        self.assertEqual(status, battle_module.VICTORY)
+        self.assertIs(battle.outcome, Victory)
+
+    def test_can_use(self):
+        cleric = heroes.Cleric()
+        vampire = monsters.Vampire()
+        battle = Battle([cleric, vampire])
+        battle.start()
+        self.assertTrue(battle.can_use('smite', vampire))
+        self.assertFalse(battle.can_use('backstab', vampire))
+        cleric.mp = 5
+        self.assertFalse(battle.can_use('smite', vampire))
+        self.assertTrue(battle.can_use('heal', cleric))
+        vampire.hp = 0
+        self.assertFalse(battle.can_use('fight', vampire))
+        self.assertEqual(cleric.mp, 5)
+
+    def test_monster_turns_take_no_commands(self):
+        warrior = heroes.Warrior()
+        dragon = monsters.GreenDragon()
+        battle = Battle([warrior, dragon], headless=True)
+        self.assertIs(battle.current_attacker(), dragon)
+        self.assertEqual(battle.step('fight', warrior),
+                         battle_module.INVALID_COMMAND)
+        self.assertEqual(battle.events, [])
+        self.assertEqual(battle.commands, [])
+        self.assertFalse(battle.can_use('fight', warrior))
+        self.assertFalse(battle.can_use('fight', warrior, dragon))
+        self.assertEqual(battle.legal_actions(), [])
+        with self.assertRaises(InvalidCommand):
+            battle.execute_command('fight', warrior)
+
+    def test_no_commands_once_over(self):
+        warrior = heroes.Warrior(level=99)
+        skeleton = monsters.Skeleton()
+        battle = Battle([warrior, skeleton], headless=True)
+        battle.start()
+        with self.assertRaises(Victory):
+            battle.execute_command('fight', skeleton)
+        hp = warrior.hp
+        self.assertEqual(battle.step('fight', warrior),
+                         battle_module.INVALID_COMMAND)
+        self.assertEqual(warrior.hp, hp)
+        self.assertFalse(battle.can_use('fight', warrior))
+        self.assertEqual(battle.legal_actions(), [])
+        with self.assertRaises(InvalidCommand):
+            battle.execute_command('fight', warrior)
+
+    def test_own_abilities_are_tried(self):
+        class Paladin(heroes.Hero):
+            __slots__ = ()
+            abilities = ['fight', 'smite']
+
+            def smite(self, target):
+                raise InsufficientMP()
+
+        paladin = Paladin()
+        orc = monsters.Orc()
+        battle = Battle([paladin, orc], headless=True)
+        battle.step()
+        self.assertTrue(battle.can_use('smite', orc))
+        self.assertEqual(battle.step('smite', orc),
+                         battle_module.INSUFFICIENT_MP)
+        with self.assertRaises(InsufficientMP):
+            battle.execute_command('smite', orc)
+
+
+class LegalActionsTestCase(unittest.TestCase):
+    def brute_force(self, battle):
+        hero = battle.current_attacker()
+        return sorted((command, index) for command in hero.abilities
+                      for index, unit in enumerate(battle.participants)
+                      if battle.can_use(command, unit))
+
+    def test_rogue(self):
+        rogue = heroes.Rogue()
+        troll = monsters.Troll()
+        orc = monsters.Orc()
+        battle = Battle([rogue, troll, orc], headless=True, seed=4)
+        battle.step()
+        self.assertIn(('backstab', 1), battle.legal_actions())
+        troll.hp -= 1
+        battle.invalidate(troll)
+        legal = battle.legal_actions()
+        self.assertNotIn(('backstab', 1), legal)
+        self.assertIn(('backstab', 2), legal)
+        self.assertIn(('rapid_strike', 1), legal)
+        rogue.mp = 4
+        self.assertNotIn(('rapid_strike', 1), battle.legal_actions())
+        self.assertEqual(sorted(battle.legal_actions()),
+                         self.brute_force(battle))
+
+    def test_restore_keeps_masks(self):
+        rogue = heroes.Rogue(level=3)
+        cleric = heroes.Cleric(level=3)
+        vampire = monsters.Vampire(level=2)
+        battle = Battle([rogue, cleric, vampire, monsters.Troll(level=2)],
+                        headless=True, seed=3)
+        battle.step()
+        snapshot = battle.snapshot()
+        before = sorted(battle.legal_actions())
+        masks = dict(battle._masks)
+        battle.step('fight', vampire)
+        battle.legal_actions()
+        battle.restore(snapshot)
+        self.assertIs(battle._masks[battle._queue[0][2]],
+                      masks[battle._queue[0][2]])
+        self.assertEqual(sorted(battle.legal_actions()), before)
+        self.assertEqual(sorted(battle.legal_actions()),
+                         self.brute_force(battle))
+
+    def test_matches_trial_checks(self):
+        import random
+        rng = random.Random(2)
+        for seed in range(5):
+            battle = Battle([heroes.Rogue(level=3), heroes.Cleric(level=3),
+                             heroes.Mage(level=2), monsters.Vampire(level=2),
+                             monsters.Troll(level=2), monsters.Orc(level=2)],
+                            headless=True, seed=seed)
+            status = battle.step()
+            while status == battle_module.ONGOING:
+                legal = battle.legal_actions()
+                self.assertEqual(sorted(legal), self.brute_force(battle))
+                command, target = rng.choice(legal)
+                status = battle.step(command, battle.participants[target])
+                self.assertNotIn(status, (battle_module.INSUFFICIENT_MP,
+                                          battle_module.INVALID_TARGET))
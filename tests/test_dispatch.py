@@ -0,0 +1,31 @@
+import unittest
+
+from rpg_battle import dispatch
+from rpg_battle import heroes
+from rpg_battle import monsters
+
+
+class DispatchTestCase(unittest.TestCase):
+    def test_ability_ids(self):
+        self.assertEqual(dispatch.ability_id('fight'), dispatch.FIGHT)
+        ability = dispatch.ability_id('fireball')
+        self.assertEqual(dispatch.ability_id('fireball'), ability)
+        self.assertEqual(dispatch.NAMES[ability], 'fireball')
+
+    def test_hero_table(self):
+        table = dispatch.dispatch(heroes.Mage)
+        self.assertIs(dispatch.dispatch(heroes.Mage), table)
+        self.assertEqual(set(table.ids), {'fight', 'fireball', 'frostbolt'})
+        fireball = table.ids['fireball']
+        self.assertEqual(table.mp_costs[fireball], 8)
+        self.assertEqual(table.mp_costs[dispatch.FIGHT], 0)
+        self.assertEqual(table.commands, ())
+
+    def test_monster_table(self):
+        table = dispatch.dispatch(monsters.RedDragon)
+        self.assertEqual([dispatch.NAMES[ability] for ability in table.commands],
+                         ['fire_breath', 'tail_swipe', 'fight'])
+        dragon = monsters.RedDragon()
+        hero = heroes.Warrior()
+        table.functions[table.ids['tail_swipe']](dragon, hero)
+        self.assertEqual(hero.hp, hero.maxhp - 24)
@@ -0,0 +1,49 @@
+import unittest
+
+from rpg_battle import fixed
+from rpg_battle.abilities import REGISTRY, STATS
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class FixedTestCase(unittest.TestCase):
+    def test_round_trip(self):
+        for value in (0, 7, -3, 2.25, 10.5, -0.0625):
+            self.assertEqual(fixed.from_fixed(fixed.to_fixed(value)), value)
+        self.assertEqual(fixed.to_fixed(2.25), 36)
+        self.assertIsInstance(fixed.from_fixed(32), int)
+
+    def test_not_representable(self):
+        with self.assertRaises(ValueError):
+            fixed.to_fixed(0.1)
+
+    def test_trunc_rounds_towards_zero(self):
+        for value in (5.5, -5.5, 3, -0.25):
+            self.assertEqual(fixed.trunc(fixed.to_fixed(value)),
+                             fixed.to_fixed(int(value)))
+
+    def test_formulas_match_floats(self):
+        stats = {'strength': 13.75, 'constitution': 4.5, 'intelligence': 9.25,
+                 'speed': 4.5, 'level': 7, 'hp': 31.5, 'maxhp': 40,
+                 'mp': 0, 'maxmp': 0}
+        scaled = dict((stat, fixed.to_fixed(value))
+                      for stat, value in stats.items())
+        scaled.update(trunc=fixed.trunc, SCALE=fixed.SCALE)
+        for ability in REGISTRY.values():
+            for effect, formula in ability.effects:
+                expected = eval(formula, dict(stats))
+                source = fixed.fixed_formula(formula, STATS)
+                self.assertEqual(eval(source, dict(scaled)),
+                                 fixed.to_fixed(expected), formula)
+
+    def test_unsupported_formula(self):
+        with self.assertRaises(ValueError):
+            fixed.fixed_formula('max(strength, 3)', STATS)
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_trunc_arrays(self):
+        values = numpy.array([88, -88, 16, -3], dtype=numpy.int32)
+        self.assertEqual(fixed.trunc(values).tolist(), [80, -80, 16, 0])
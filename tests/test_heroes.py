@@ -345,3 +345,50 @@ class RogueTestCase(unittest.TestCase):
         self.hero.mp = 0
         with self.assertRaises(InsufficientMP):
             self.hero.rapid_strike(self.dummy)
+
+
+class ClosedFormLevellingTestCase(unittest.TestCase):
+    classes = [heroes.Hero, heroes.Warrior, heroes.Mage, heroes.Cleric,
+               heroes.Rogue]
+    fields = ['level', 'xp', 'hp', 'mp', 'maxhp', 'maxmp', 'strength',
+              'constitution', 'intelligence', 'speed']
+
+    def stats(self, hero):
+        return [getattr(hero, field) for field in self.fields]
+
+    def test_level_up_many_matches_single_level_ups(self):
+        for cls in self.classes:
+            for levels in (2, 3, 10, 57):
+                closed = cls()
+                single = cls()
+                closed.maxhp -= 4.5
+                single.maxhp -= 4.5
+                closed.level_up(levels)
+                for _ in range(levels):
+                    single.level_up()
+                self.assertEqual(self.stats(closed), self.stats(single))
+
+    def test_gain_xp_matches_single_level_ups(self):
+        for cls in self.classes:
+            for xp in (9, 10, 15.5, 1000, 123456):
+                closed = cls(level=3)
+                single = cls(level=3)
+                closed.gain_xp(xp)
+                single.xp += xp
+                while single.xp >= single.xp_for_next_level():
+                    single.level_up()
+                self.assertEqual(self.stats(closed), self.stats(single))
+
+    def test_high_level(self):
+        hero = heroes.Warrior(level=100000)
+        self.assertEqual(hero.level, 100000)
+        self.assertEqual(hero.strength, 7 + 2 * 99999)
+        hero.gain_xp(10 ** 12)
+        self.assertEqual(hero.level, 458257)
+        self.assertLess(hero.xp, hero.xp_for_next_level())
+
+    def test_compact_instances(self):
+        for cls in self.classes:
+            hero = cls()
+            self.assertFalse(hasattr(hero, '__dict__'))
+            self.assertEqual(hero.abilities, cls.abilities)
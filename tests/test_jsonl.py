@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from rpg_battle import heroes
+from rpg_battle import jsonl
+from rpg_battle import monsters
+from rpg_battle import simulate
+from rpg_battle.battle import Battle, ONGOING
+
+
+class JsonLinesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def units(self):
+        mage = heroes.Mage(level=4)
+        mage.gain_xp(13.25)
+        orc = monsters.Orc(level=2)
+        orc.attack(mage)
+        return [heroes.Warrior(), mage, orc, monsters.Vampire(3)]
+
+    def assertSameUnits(self, actual, expected):
+        self.assertEqual([jsonl.unit_to_dict(unit) for unit in actual],
+                         [jsonl.unit_to_dict(unit) for unit in expected])
+
+    def test_units_round_trip(self):
+        for name in ('units.jsonl', 'units.jsonl.gz'):
+            path = self.path(name)
+            units = self.units()
+            self.assertEqual(jsonl.write_units(path, iter(units), batch=3), 4)
+            self.assertSameUnits(list(jsonl.read_units(path)), units)
+
+    def test_gzip(self):
+        path = self.path('units.jsonl.gz')
+        jsonl.write_units(path, self.units())
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(2), b'\x1f\x8b')
+
+    def test_lazy(self):
+        path = self.path('units.jsonl')
+        jsonl.write_units(path, (heroes.Rogue(level) for level in range(1, 50)))
+        reader = jsonl.read_units(path)
+        self.assertEqual(next(reader).level, 1)
+        self.assertEqual(next(reader).level, 2)
+        reader.close()
+
+    def test_encounter_definition(self):
+        path = self.path('encounters.jsonl')
+        with open(path, 'w') as f:
+            f.write('{"class": "Troll", "level": 3}\n\n'
+                    '{"class": "Cleric", "level": 2, "hp": 50}\n')
+        troll, cleric = jsonl.read_units(path)
+        self.assertSameUnits([troll], [monsters.Troll(3)])
+        self.assertEqual(cleric.hp, 50)
+        self.assertEqual(cleric.maxhp, heroes.Cleric(2).maxhp)
+        with self.assertRaises(ValueError):
+            jsonl.unit_from_dict({'class': 'Bard'})
+
+    def test_battle_summaries(self):
+        def battles():
+            for seed in range(5):
+                warrior = heroes.Warrior(5)
+                warrior.hp -= 7
+                battle = Battle([warrior, monsters.Orc(level=3),
+                                 monsters.Skeleton()], headless=True, seed=seed)
+                status = battle.step()
+                while status == ONGOING:
+                    status = battle.step('fight', battle.participants[
+                        battle.alive_monsters[0]])
+                yield battle
+
+        path = self.path('battles.jsonl.gz')
+        self.assertEqual(jsonl.write_battles(path, battles(), batch=2), 5)
+        summaries = list(jsonl.read(path))
+        self.assertEqual(len(summaries), 5)
+        for seed, summary in enumerate(summaries):
+            self.assertEqual(summary['seed'], seed)
+            self.assertIn(summary['outcome'], ('Victory', 'Defeat'))
+            self.assertEqual(summary['participants'][0]['class'], 'Warrior')
+            self.assertEqual(summary['roster'][0]['hp'],
+                             heroes.Warrior(5).hp - 7)
+            self.assertEqual(summary['roster'][1]['level'], 3)
+            replayed = jsonl.replay_summary(summary)
+            self.assertEqual(replayed.outcome.__name__, summary['outcome'])
+            self.assertEqual(jsonl.battle_summary(replayed), summary)
+
+    def test_simulation_results(self):
+        result = simulate.run_battle([(heroes.Warrior, 5)],
+                                     [(monsters.Orc, 1)], seed=1)
+        path = self.path('results.jsonl')
+        jsonl.write_battles(path, [result])
+        summary, = jsonl.read(path)
+        self.assertEqual(summary['runs'], 1)
+        self.assertEqual(summary['wins'], result.wins)
+        self.assertEqual(summary['damage'], result.damage)
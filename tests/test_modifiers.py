@@ -0,0 +1,95 @@
+import unittest
+
+from rpg_battle import heroes
+from rpg_battle import modifiers
+from rpg_battle import monsters
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class PipelineTestCase(unittest.TestCase):
+    def test_resolved_operations(self):
+        dragon = modifiers.pipeline(monsters.RedDragon)
+        self.assertEqual(dragon.damage, [modifiers.reduce(5)])
+        self.assertEqual(dragon.healing, [modifiers.CAP])
+        vampire = modifiers.pipeline(monsters.Vampire)
+        self.assertEqual(vampire.healing, [modifiers.INVERT])
+        self.assertIs(modifiers.pipeline(monsters.Vampire), vampire)
+
+    def test_installed_methods(self):
+        # through __dict__, class access gives unbound methods on Python 2
+        self.assertIs(heroes.Warrior.__dict__['take_damage'],
+                      modifiers.pipeline(heroes.Warrior).take_damage)
+        self.assertEqual(monsters.Troll.take_damage.modifiers, [])
+
+    def test_composed_modifiers(self):
+        class Golem(monsters.Monster):
+            __slots__ = ()
+            damage_modifiers = (modifiers.reduce(2), modifiers.FLOOR,
+                                modifiers.reduce(1))
+
+        golem = Golem()
+        golem.take_damage(4)
+        self.assertEqual(golem.hp, 9)
+        golem.take_damage(3)
+        self.assertEqual(golem.hp, 9)
+        golem.take_damage(20)
+        self.assertEqual(golem.hp, 0)
+
+    def test_own_methods_are_kept(self):
+        class Ghost(monsters.Undead):
+            __slots__ = ()
+
+            def take_damage(self, damage):
+                pass
+
+        class Wraith(Ghost):
+            __slots__ = ()
+            damage_modifiers = (modifiers.reduce(1),)
+
+        wraith = Wraith()
+        wraith.take_damage(5)
+        self.assertEqual(wraith.hp, wraith.maxhp)
+        wraith.heal_damage(3)
+        self.assertEqual(wraith.hp, wraith.maxhp - 3)
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class ColumnModifiersTestCase(unittest.TestCase):
+    def test_matches_units(self):
+        classes = [heroes.Warrior, monsters.RedDragon, monsters.Vampire,
+                   monsters.Troll]
+        for kind, method in (('damage', 'take_damage'),
+                             ('healing', 'heal_damage')):
+            for amount in (3, 5, 7.5, 200):
+                units = [cls() for cls in classes]
+                for unit in units:
+                    unit.hp -= 4
+                hp = numpy.array([unit.hp for unit in units], dtype=float)
+                maxhp = numpy.array([unit.maxhp for unit in units])
+                class_id = numpy.arange(len(classes))
+                result = modifiers.apply_columns(kind, classes, class_id, hp,
+                                                 maxhp, amount)
+                for unit in units:
+                    getattr(unit, method)(amount)
+                self.assertEqual(result.tolist(), [unit.hp for unit in units])
+
+    def test_clamps_only_changed_rows(self):
+        class Golem(monsters.Monster):
+            __slots__ = ()
+            damage_modifiers = (modifiers.reduce(2), modifiers.FLOOR)
+            healing_modifiers = (modifiers.reduce(2), modifiers.CAP)
+
+        for kind, method, hp in (('damage', 'take_damage', -3),
+                                 ('healing', 'heal_damage', 100)):
+            for amount in (1, 3, 200):
+                golem = Golem()
+                golem.hp = hp
+                result = modifiers.apply_columns(
+                    kind, [Golem], numpy.array([0]), numpy.array([hp]),
+                    numpy.array([golem.maxhp]), amount)
+                getattr(golem, method)(amount)
+                self.assertEqual(result.tolist(), [golem.hp])
@@ -1,5 +1,7 @@
+import pickle
 import unittest
 
+from rpg_battle import dispatch
 from rpg_battle import monsters
 from rpg_battle.exceptions import *
 
@@ -376,3 +378,33 @@ class HumanoidTestCase(unittest.TestCase):
         orc.blood_rage(self.dummy)
         self.assertEqual(self.dummy.hp, self.dummy.maxhp - 28)
         self.assertEqual(orc.hp, orc.maxhp - 4)
+
+
+class CompactMonsterTestCase(unittest.TestCase):
+    def test_compact_instances(self):
+        for cls in (monsters.Monster, monsters.RedDragon, monsters.GreenDragon,
+                    monsters.Vampire, monsters.Skeleton, monsters.Troll,
+                    monsters.Orc):
+            monster = cls(level=2)
+            self.assertFalse(hasattr(monster, '__dict__'))
+            self.assertEqual(monster.command_index, 0)
+
+
+class CommandCycleTestCase(unittest.TestCase):
+    def test_attack_cycles_command_queue(self):
+        dragon = monsters.RedDragon()
+        dummy = TargetDummy()
+        used = [dispatch.NAMES[dragon.attack(dummy)] for _ in range(4)]
+        self.assertEqual(used, ['fire_breath', 'tail_swipe', 'fight',
+                                'fire_breath'])
+        self.assertEqual(dragon.command_index, 4)
+
+    def test_pickled_cursor(self):
+        vampire = monsters.Vampire()
+        vampire.attack(TargetDummy())
+        vampire.hp -= 3
+        copy = pickle.loads(pickle.dumps(vampire, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(copy.command_index, 1)
+        self.assertEqual(copy.hp, vampire.hp)
+        self.assertEqual(dispatch.NAMES[copy.attack(TargetDummy())], 'bite')
+        self.assertEqual(dispatch.NAMES[vampire.attack(TargetDummy())], 'bite')
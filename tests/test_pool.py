@@ -0,0 +1,71 @@
+import unittest
+
+from rpg_battle import heroes
+from rpg_battle import monsters
+from rpg_battle import simulate
+from rpg_battle.pool import UnitPool
+
+
+class ResetTestCase(unittest.TestCase):
+    def test_hero_reset(self):
+        mage = heroes.Mage(level=20)
+        fresh = heroes.Mage(level=20)
+        monsters.Vampire(level=10).bite(mage)
+        self.assertLess(mage.maxhp, fresh.maxhp)
+        mage.fireball(monsters.Orc())
+        mage.gain_xp(500)
+        mage.reset()
+        for field in heroes.Hero.__slots__:
+            self.assertEqual(getattr(mage, field), getattr(fresh, field))
+
+    def test_reset_to_level(self):
+        rogue = heroes.Rogue()
+        rogue.reset(level=5)
+        self.assertEqual(rogue.maxhp, heroes.Rogue(level=5).maxhp)
+        rogue.gain_xp(100)
+        rogue.reset()
+        self.assertEqual(rogue.level, 5)
+
+    def test_monster_reset(self):
+        troll = monsters.Troll(level=3)
+        troll.attack(heroes.Warrior())
+        troll.take_damage(7)
+        troll.reset()
+        fresh = monsters.Troll(level=3)
+        self.assertEqual((troll.hp, troll.maxhp, troll.command_index),
+                         (fresh.hp, fresh.maxhp, 0))
+
+
+class UnitPoolTestCase(unittest.TestCase):
+    def test_reuses_released_units(self):
+        pool = UnitPool()
+        units = pool.acquire_all([(heroes.Warrior, 20), (monsters.Orc, 2)])
+        units[0].take_damage(30)
+        pool.release(units)
+        self.assertEqual(len(pool), 2)
+        warrior = pool.acquire(heroes.Warrior, 20)
+        self.assertIs(warrior, units[0])
+        self.assertEqual(warrior.hp, warrior.maxhp)
+        self.assertIsNot(pool.acquire(heroes.Warrior, 20), warrior)
+        self.assertEqual(pool.created, 3)
+
+    def test_pooled_battles_match(self):
+        party = [(heroes.Cleric, 4), (heroes.Warrior, 3)]
+        lineup = [(monsters.Vampire, 3), (monsters.Skeleton, 2)]
+        pool = UnitPool()
+        for seed in range(20):
+            pooled = simulate.run_battle(party, lineup, seed=seed, pool=pool)
+            fresh = simulate.run_battle(party, lineup, seed=seed)
+            self.assertEqual(pooled.turns, fresh.turns)
+            self.assertEqual(pooled.damage, fresh.damage)
+        self.assertEqual(pool.created, 4)
+
+    def test_released_when_policy_raises(self):
+        def policy(battle, hero):
+            raise RuntimeError('no orders')
+
+        pool = UnitPool()
+        with self.assertRaises(RuntimeError):
+            simulate.run_battle([(heroes.Warrior, 3)], [(monsters.Orc, 1)],
+                                policy=policy, seed=1, pool=pool)
+        self.assertEqual(len(pool), 2)
@@ -0,0 +1,100 @@
+import unittest
+
+from rpg_battle import heroes
+from rpg_battle import monsters
+from rpg_battle.battle import INSUFFICIENT_MP, ONGOING, Battle
+from rpg_battle.exceptions import *
+from rpg_battle.profiling import TURN_PHASES, BattleProfile
+
+
+def _battle():
+    return Battle([heroes.Mage(level=3), monsters.Orc(), monsters.Troll()],
+                  seed=2)
+
+
+def _play(battle):
+    status = battle.step()
+    while status == ONGOING:
+        hero = battle.current_attacker()
+        command = 'fireball' if hero.mp >= 8 else 'fight'
+        status = battle.step(command,
+                             battle.participants[battle.alive_monsters[0]])
+    return status
+
+
+class ProfilingTestCase(unittest.TestCase):
+    def test_disabled_by_default(self):
+        battle = _battle()
+        self.assertIsNone(battle.profile)
+        battle.enable_profiling()
+        battle.disable_profiling()
+        self.assertFalse(set(battle.__dict__) &
+                         {'step', '_act', '_reschedule', '_casualties',
+                          'current_attacker', 'render'})
+
+    def test_ability_statistics(self):
+        battle = _battle()
+        profile = battle.enable_profiling(keep_turns=True)
+        mage = battle.participants[0]
+        battle.step()
+        mage.mp = 0
+        battle.step('fireball', battle.participants[1])
+        mage.mp = mage.maxmp
+        _play(battle)
+
+        fireball = profile.abilities[('Mage', 'fireball')]
+        self.assertEqual(fireball.errors, {'InsufficientMP': 1})
+        self.assertTrue(fireball.calls > 0)
+        self.assertTrue(fireball.damage >= 14 * fireball.calls)
+        self.assertTrue(profile.abilities[('Orc', 'blood_rage')].time > 0)
+        calls = sum(stats.calls for stats in profile.abilities.values())
+        self.assertEqual(profile.turn_count, calls)
+        self.assertEqual(len(profile.turns), calls)
+        self.assertTrue(all(len(turn) == len(TURN_PHASES)
+                            for turn in profile.turns))
+        for phase in ('schedule', 'ability', 'bookkeeping'):
+            self.assertTrue(profile.phases[phase] > 0)
+        # step does not render, start and execute_command do
+        self.assertEqual(profile.phases['render'], 0)
+        battle.render()
+        self.assertTrue(profile.phases['render'] > 0)
+        self.assertIn('fireball', profile.report())
+
+    def test_own_ability_error_counted_once(self):
+        class Bard(heroes.Hero):
+            __slots__ = ()
+            abilities = ['fight', 'song']
+
+            def song(self, target):
+                raise InsufficientMP()
+
+        battle = Battle([Bard(level=3), monsters.Orc()], seed=1)
+        profile = battle.enable_profiling()
+        battle.step()
+        status = battle.step('song', battle.participants[1])
+        self.assertEqual(status, INSUFFICIENT_MP)
+        self.assertEqual(profile.abilities[('Bard', 'song')].errors,
+                         {'InsufficientMP': 1})
+        with self.assertRaises(InsufficientMP):
+            battle.execute_command('song', battle.participants[1])
+        self.assertEqual(profile.abilities[('Bard', 'song')].errors,
+                         {'InsufficientMP': 2})
+
+    def test_render_not_in_turns(self):
+        battle = _battle()
+        profile = battle.enable_profiling(keep_turns=True)
+        battle.start()
+        battle.execute_command('fight',
+                               battle.participants[battle.alive_monsters[0]])
+        self.assertTrue(profile.phases['render'] > 0)
+        self.assertEqual(profile.turn_count, len(profile.turns))
+
+    def test_same_battle(self):
+        plain = _battle()
+        profiled = _battle()
+        profile = BattleProfile()
+        profiled.enable_profiling(profile)
+        self.assertEqual(_play(plain), _play(profiled))
+        self.assertEqual(plain.commands, profiled.commands)
+        self.assertEqual([unit.hp for unit in plain.participants],
+                         [unit.hp for unit in profiled.participants])
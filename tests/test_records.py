@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from rpg_battle import heroes
+from rpg_battle import monsters
+from rpg_battle import records
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class RecordsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'units.bin')
+        mage = heroes.Mage(level=4)
+        mage.gain_xp(13.25)
+        mage.take_damage(7.5)
+        vampire = monsters.Vampire(level=3)
+        vampire.bite(mage)
+        self.units = [heroes.Warrior(), mage, vampire, monsters.Skeleton(2),
+                      heroes.Rogue(level=12)]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assertSameUnit(self, actual, expected):
+        self.assertIs(type(actual), type(expected))
+        self.assertEqual(records.pack(actual), records.pack(expected))
+
+    def test_round_trip(self):
+        self.assertEqual(records.save(self.path, iter(self.units), batch=2), 5)
+        self.assertEqual(os.path.getsize(self.path),
+                         records.HEADER.size + 5 * records.RECORD.size)
+        loaded = records.load(self.path)
+        self.assertEqual(len(loaded), 5)
+        for actual, expected in zip(loaded, self.units):
+            self.assertSameUnit(actual, expected)
+        # loaded units are fully working units
+        loaded[0].gain_xp(10)
+        self.assertEqual(loaded[0].level, 2)
+        loaded[2].attack(loaded[0])
+        loaded[0].reset()
+        self.assertEqual(loaded[0].hp, heroes.Warrior().hp)
+
+    def test_random_access(self):
+        records.save(self.path, self.units)
+        with records.RecordFile(self.path) as units:
+            self.assertEqual(len(units), 5)
+            self.assertSameUnit(units[-1], self.units[-1])
+            self.assertSameUnit(units[2], self.units[2])
+            self.assertEqual(units.record(3).class_id,
+                             records.CLASSES.index(monsters.Skeleton))
+            with self.assertRaises(IndexError):
+                units[5]
+
+    def test_update_in_place(self):
+        records.save(self.path, self.units)
+        with records.RecordFile(self.path, writable=True) as units:
+            hero = units[0]
+            hero.gain_xp(100)
+            units[0] = hero
+            units.update(1, hp=1)
+        with records.RecordFile(self.path) as units:
+            self.assertEqual(units[0].level, hero.level)
+            self.assertEqual(units[1].hp, 1)
+            self.assertSameUnit(units[2], self.units[2])
+
+    def test_unknown_class(self):
+        class Bard(heroes.Hero):
+            __slots__ = ()
+        with self.assertRaises(ValueError):
+            records.save(self.path, [Bard()])
+
+    def test_not_a_record_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not records at all')
+        with self.assertRaises(ValueError):
+            records.RecordFile(self.path)
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_columns(self):
+        records.save(self.path, self.units)
+        with records.RecordFile(self.path, writable=True) as units:
+            columns = units.columns()
+            self.assertEqual(columns['level'].tolist(), [1, 4, 3, 2, 12])
+            self.assertEqual(columns['hp'][1], self.units[1].hp)
+            columns['hp'][0] = 5
+            del columns
+            self.assertEqual(units[0].hp, 5)
@@ -0,0 +1,84 @@
+import unittest
+
+from rpg_battle import heroes
+
+try:
+    import numpy
+    from rpg_battle.roster import Roster, FIELDS
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class RosterTestCase(unittest.TestCase):
+    def setUp(self):
+        classes = [heroes.Hero, heroes.Warrior, heroes.Mage, heroes.Cleric,
+                   heroes.Rogue]
+        self.heroes = [cls(level=level) for level in (1, 2, 7, 30)
+                       for cls in classes]
+        # bitten heroes have fractional maxhp
+        for hero in self.heroes[::3]:
+            hero.maxhp -= 4.5
+        self.roster = Roster(self.heroes)
+
+    def assertMatchesHeroes(self):
+        for index, hero in enumerate(self.heroes):
+            for field in FIELDS:
+                self.assertEqual(getattr(self.roster, field)[index],
+                                 getattr(hero, field), field)
+
+    def test_columns(self):
+        self.assertEqual(len(self.roster), 20)
+        self.assertMatchesHeroes()
+
+    def test_gain_xp(self):
+        for xp in (0, 9, 15.5, 1000, 123456):
+            self.roster.gain_xp(xp)
+            for hero in self.heroes:
+                hero.gain_xp(xp)
+            self.assertMatchesHeroes()
+
+    def test_gain_xp_per_hero(self):
+        grants = numpy.arange(len(self.heroes)) * 37.5
+        self.roster.gain_xp(grants)
+        for hero, xp in zip(self.heroes, grants):
+            hero.gain_xp(xp.item())
+        self.assertMatchesHeroes()
+
+    def test_level_up_selection(self):
+        self.roster.level_up(4, index=numpy.arange(0, 20, 2))
+        for hero in self.heroes[::2]:
+            hero.level_up(4)
+        self.assertMatchesHeroes()
+
+    def test_view(self):
+        view = self.roster[6]
+        self.assertIsInstance(view, type(self.heroes[6]))
+        self.assertEqual(view.level, self.heroes[6].level)
+        view.take_damage(10)
+        self.assertEqual(self.roster.hp[6], self.heroes[6].hp - 10)
+        view.gain_xp(500)
+        self.heroes[6].gain_xp(500)
+        self.assertEqual(self.roster.level[6], self.heroes[6].level)
+
+    def test_view_reset(self):
+        view = self.roster[7]
+        view.gain_xp(500)
+        view.take_damage(10)
+        view.reset()
+        fresh = type(self.heroes[7])(level=self.heroes[7].level)
+        for field in FIELDS:
+            self.assertEqual(getattr(self.roster, field)[7],
+                             getattr(fresh, field), field)
+
+    def test_to_hero(self):
+        hero = self.roster.to_hero(3)
+        self.assertIs(type(hero), type(self.heroes[3]))
+        self.assertEqual(hero.maxhp, self.heroes[3].maxhp)
+
+    def test_append_grows(self):
+        roster = Roster(capacity=1)
+        for _ in range(5):
+            roster.append(heroes.Rogue(level=3))
+        self.assertEqual(len(roster), 5)
+        self.assertEqual(roster.speed.tolist(), [14] * 5)
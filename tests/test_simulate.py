@@ -0,0 +1,48 @@
+import unittest
+
+from rpg_battle import heroes
+from rpg_battle import monsters
+from rpg_battle import simulate
+
+
+class SimulateTestCase(unittest.TestCase):
+    def test_run_battle_victory(self):
+        result = simulate.run_battle([(heroes.Rogue, 99)],
+                                     [(monsters.Skeleton, 1)])
+        self.assertEqual(result.runs, 1)
+        self.assertEqual(result.wins, 1)
+        self.assertEqual(dict(result.turns), {1: 1})
+        self.assertEqual(result.damage, [203, 0])
+
+    def test_run_battle_defeat(self):
+        result = simulate.run_battle([(heroes.Mage, 1)],
+                                     [(monsters.RedDragon, 99)])
+        self.assertEqual(result.losses, 1)
+        self.assertEqual(result.win_rate, 0.0)
+
+    def test_simulate_in_process(self):
+        result = simulate.simulate([(heroes.Warrior, 5), (heroes.Mage, 5)],
+                                   [(monsters.Orc, 1)],
+                                   runs=50, processes=1, chunksize=20)
+        self.assertEqual(result.runs, 50)
+        self.assertEqual(result.wins + result.losses + result.draws, 50)
+        self.assertEqual(sum(result.turns.values()), 50)
+        self.assertEqual(len(result.damage), 3)
+
+    def test_simulate_process_pool(self):
+        result = simulate.simulate([(heroes.Cleric, 3)],
+                                   [(monsters.Troll, 1), (monsters.Orc, 1)],
+                                   runs=40, processes=2, chunksize=10)
+        self.assertEqual(result.runs, 40)
+        self.assertEqual(sum(result.turns.values()), 40)
+
+    def test_seeded_simulations_repeat(self):
+        party = [(heroes.Warrior, 2), (heroes.Cleric, 2)]
+        lineup = [(monsters.Vampire, 2), (monsters.Orc, 2)]
+        first = simulate.simulate(party, lineup, runs=30, processes=1,
+                                  chunksize=7, seed=99)
+        second = simulate.simulate(party, lineup, runs=30, processes=2,
+                                   chunksize=7, seed=99)
+        self.assertEqual(first.wins, second.wins)
+        self.assertEqual(first.turns, second.turns)
+        self.assertEqual(first.damage, second.damage)
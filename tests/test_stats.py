@@ -0,0 +1,43 @@
+import unittest
+
+from rpg_battle import heroes
+from rpg_battle import monsters
+from rpg_battle.stats import StatTable
+
+
+class StatTableTestCase(unittest.TestCase):
+    def test_row_is_cached(self):
+        table = StatTable()
+        row = table.row(heroes.Warrior, 4)
+        self.assertIs(table.row(heroes.Warrior, 4), row)
+        self.assertEqual(table.misses, 1)
+        self.assertEqual(row[heroes.Hero.__slots__.index('level')], 4)
+        self.assertEqual(row[heroes.Hero.__slots__.index('strength')], 13)
+
+    def test_least_recently_used_row_dropped(self):
+        table = StatTable(maxsize=2)
+        table.row(monsters.Orc, 1)
+        table.row(monsters.Orc, 2)
+        table.row(monsters.Orc, 1)
+        table.row(monsters.Orc, 3)
+        self.assertEqual(len(table), 2)
+        table.row(monsters.Orc, 1)
+        self.assertEqual(table.misses, 3)
+        table.row(monsters.Orc, 2)
+        self.assertEqual(table.misses, 4)
+
+    def test_precompute(self):
+        table = StatTable(maxsize=None)
+        table.precompute([heroes.Mage, monsters.Troll], range(1, 11))
+        self.assertEqual(len(table), 20)
+        self.assertEqual(table.misses, 20)
+
+    def test_units_do_not_share_state(self):
+        first = monsters.Vampire(level=3)
+        second = monsters.Vampire(level=3)
+        first.take_damage(5)
+        self.assertEqual(second.hp, second.maxhp)
+        warrior = heroes.Warrior(level=3)
+        warrior.gain_xp(100)
+        self.assertEqual(heroes.Warrior(level=3).xp, 0)
+        self.assertEqual(heroes.Warrior(level=3).level, 3)
@@ -0,0 +1,77 @@
+import unittest
+
+from rpg_battle import heroes
+from rpg_battle import monsters
+from rpg_battle import simulate
+
+try:
+    import numpy
+    from rpg_battle import vectorized
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class BatchBattleTestCase(unittest.TestCase):
+    # single hero parties make monster targeting deterministic, so every
+    # batched battle must replay the object engine exactly
+    lineups = [
+        ([(heroes.Warrior, 5)],
+         [(monsters.Orc, 1), (monsters.Skeleton, 2), (monsters.Vampire, 1)]),
+        ([(heroes.Rogue, 3)], [(monsters.GreenDragon, 1)]),
+        ([(heroes.Mage, 10)], [(monsters.Troll, 2), (monsters.RedDragon, 1)]),
+        ([(heroes.Cleric, 8)],
+         [(monsters.Vampire, 3), (monsters.Vampire, 3), (monsters.Troll, 1)]),
+        ([(heroes.Hero, 30)], [(monsters.RedDragon, 4)]),
+    ]
+
+    def test_columns(self):
+        battle = vectorized.BatchBattle([(heroes.Warrior, 1)],
+                                        [(monsters.Orc, 1)], 3)
+        self.assertEqual(battle.hp.shape, (3, 2))
+        self.assertEqual(battle.hp[:, 0].tolist(), [104, 104, 104])
+        self.assertEqual(battle.strength[:, 1].tolist(), [14, 14, 14])
+        self.assertTrue(battle.alive.all())
+        self.assertEqual(battle.is_hero.tolist(), [True, False])
+
+    def test_matches_object_engine(self):
+        for party, lineup in self.lineups:
+            expected = simulate.run_battle(party, lineup)
+            result = vectorized.BatchBattle(party, lineup, 5).run()
+            self.assertEqual(result.runs, 5)
+            self.assertEqual(result.wins, expected.wins * 5)
+            self.assertEqual(result.losses, expected.losses * 5)
+            self.assertEqual(dict(result.turns),
+                             dict((turns, count * 5) for turns, count
+                                  in expected.turns.items()))
+            for actual, damage in zip(result.damage, expected.damage):
+                self.assertAlmostEqual(actual, damage * 5)
+
+    def test_fixed_point_matches_floats(self):
+        lineups = self.lineups + [
+            ([(heroes.Warrior, 3), (heroes.Mage, 2), (heroes.Cleric, 4)],
+             [(monsters.Skeleton, 4), (monsters.Orc, 3),
+              (monsters.Vampire, 2)])]
+        for party, lineup in lineups:
+            floats = vectorized.BatchBattle(party, lineup, 20, seed=3)
+            fixed = vectorized.BatchBattle(party, lineup, 20, seed=3,
+                                           fixed=True)
+            self.assertEqual(fixed.hp.dtype, numpy.int32)
+            expected = floats.run()
+            result = fixed.run()
+            self.assertEqual(result.wins, expected.wins)
+            self.assertEqual(dict(result.turns), dict(expected.turns))
+            self.assertEqual(result.damage, expected.damage)
+            for stat in vectorized.STATS:
+                self.assertEqual((getattr(floats, stat) * fixed.scale).tolist(),
+                                 getattr(fixed, stat).tolist(), stat)
+
+    def test_level_up_matches_hero(self):
+        battle = vectorized.BatchBattle([(heroes.Warrior, 1)],
+                                        [(monsters.Orc, 1)], 1)
+        battle._gain_xp(numpy.array([0]), numpy.array([75.0]))
+        warrior = heroes.Warrior()
+        warrior.gain_xp(75)
+        for stat in vectorized.STATS:
+            self.assertEqual(getattr(battle, stat)[0, 0],
+                             getattr(warrior, stat), stat)
@@ -0,0 +1,138 @@
+import itertools
+import unittest
+
+from rpg_battle import events
+from rpg_battle import heroes
+from rpg_battle import monsters
+from rpg_battle.battle import Battle
+from rpg_battle.exceptions import *
+from rpg_battle.waves import waves
+
+
+def _play(battle, batch):
+    """
+    Fights the first living monster until the battle ends, returns all
+    events and the outcome
+    """
+    seen = list(batch)
+    try:
+        while True:
+            target = battle.participants[min(battle.alive_monsters)]
+            seen += battle.execute_command('fight', target)
+    except (Victory, Defeat) as e:
+        return seen + list(e.args[0]), type(e)
+
+
+class WavesTestCase(unittest.TestCase):
+    def test_lazy_and_endless(self):
+        first = list(itertools.islice(waves(seed=3), 100))
+        self.assertEqual(len(first), 100)
+        self.assertTrue(all(len(wave) == 3 for wave in first))
+
+    def test_seeded(self):
+        def kinds(seed):
+            return [[type(unit) for unit in wave]
+                    for wave in waves(seed=seed, count=20)]
+        self.assertEqual(kinds(7), kinds(7))
+        self.assertNotEqual(kinds(7), kinds(8))
+
+    def test_mix_size_and_levels(self):
+        generated = list(waves({monsters.Orc: 1, monsters.Troll: 0},
+                               size=(1, 4), level=2, level_step=3, every=2,
+                               seed=1, count=6))
+        self.assertEqual(len(generated), 6)
+        for number, wave in enumerate(generated):
+            self.assertTrue(1 <= len(wave) <= 4)
+            for monster in wave:
+                self.assertIsInstance(monster, monsters.Orc)
+                self.assertEqual(monster.level, 2 + (number // 2) * 3)
+
+    def test_empty_waves_rejected(self):
+        self.assertRaises(ValueError, waves, size=(0, 2))
+        self.assertRaises(ValueError, waves, size=0)
+
+
+class SurvivalBattleTestCase(unittest.TestCase):
+    def battle(self):
+        return Battle([heroes.Warrior(level=40)], headless=True, seed=5,
+                      waves=waves(size=2, seed=9, count=4))
+
+    def test_waves_join_battle(self):
+        battle = self.battle()
+        seen, outcome = _play(battle, battle.start())
+        self.assertIs(outcome, Victory)
+        self.assertEqual(battle.wave, 4)
+        # the hero and the last wave, earlier waves were dropped
+        self.assertEqual(len(battle.participants), 3)
+        self.assertEqual([event.amount for event in seen
+                          if event.kind == events.WAVE], [1, 2, 3, 4])
+
+    def test_empty_waves_skipped(self):
+        battle = Battle([heroes.Warrior(level=60)], headless=True, seed=5,
+                        waves=iter([[], [monsters.Orc()], [], [],
+                                    [monsters.Orc(), monsters.Orc()], []]))
+        seen, outcome = _play(battle, battle.start())
+        self.assertIs(outcome, Victory)
+        self.assertEqual(battle.wave, 2)
+        self.assertEqual([event.amount for event in seen
+                          if event.kind == events.WAVE], [1, 2])
+
+    def test_restore_meets_same_waves(self):
+        battle = self.battle()
+        battle.start()
+        snapshot = battle.snapshot()
+        expected, _ = _play(battle, [])
+        battle.restore(snapshot)
+        self.assertEqual(battle.wave, 1)
+        self.assertEqual(len(battle.participants), 3)
+        self.assertEqual(_play(battle, [])[0], expected)
+
+    def test_participants_stay_bounded(self):
+        battle = Battle([heroes.Warrior(level=60)], headless=True, seed=5,
+                        waves=waves(size=(1, 3), level_step=0, seed=9,
+                                    count=500))
+        battle.start()
+        snapshot = battle.snapshot()
+        most = 0
+        while battle.outcome is None:
+            target = battle.participants[battle.alive_monsters[0]]
+            battle.step('fight', target)
+            most = max(most, len(battle.participants))
+            battle.legal_actions()
+        self.assertIs(battle.outcome, Victory)
+        self.assertEqual(battle.wave, 500)
+        self.assertTrue(most <= 1 + 2 * 3)
+        self.assertEqual(len(battle.monsters), len(battle.participants) - 1)
+        # the snapshot still meets the same waves, in the same slots
+        final = [unit.hp for unit in battle.participants]
+        commands = list(battle.commands)
+        battle.restore(snapshot)
+        for command, target in commands[len(battle.commands):]:
+            battle.step(command, battle.participants[target])
+        self.assertEqual([unit.hp for unit in battle.participants], final)
+
+    def test_wave_log_kept_by_snapshots_only(self):
+        def logged(battle):
+            cell, count = battle._log, 0
+            while cell[0] is not None:
+                cell, count = cell[1], count + 1
+            return count
+
+        battle = self.battle()
+        battle.start()
+        snapshot = battle.snapshot()
+        _play(battle, [])
+        # earlier waves are only reachable through the snapshot
+        self.assertEqual(logged(battle), 0)
+        battle.restore(snapshot)
+        self.assertEqual(logged(battle), 3)
+
+    def test_replay(self):
+        battle = self.battle()
+        _play(battle, battle.start())
+        replayed = Battle.replay([heroes.Warrior(level=40)], 5,
+                                 battle.commands,
+                                 waves=waves(size=2, seed=9, count=4))
+        self.assertIs(replayed.outcome, Victory)
+        self.assertEqual(replayed.participants[0].hp,
+                         battle.participants[0].hp)